@@ -0,0 +1,37 @@
+"""
+Writing files so that readers never see a partial one.
+
+Metrics textfiles, stage cache entries and work-queue files are read by
+other processes (node_exporter, other workers, other machines) while they
+are being replaced. Each is written to a hidden temporary file next to its
+destination and then moved into place with one atomic rename.
+"""
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def temporary_path(path):
+    """Returns a unique hidden temporary name next to path (".name.<random>.tmp")."""
+    path = Path(path)
+    return path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yields a temporary path to write instead of path. When the block
+    finishes, the file is moved into place; if it fails, the temporary file
+    is removed and path is left as it was.
+    """
+    tmp_path = temporary_path(path)
+    try:
+        yield tmp_path
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    os.replace(tmp_path, path)
@@ -0,0 +1,326 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+from collections import Counter
+from pathlib import Path
+
+from subtitle_io import read_subtitles
+
+
+# Short English subtitle lines used when no SRT file is given.
+SAMPLE_TEXTS = [
+    "Welcome back to the channel.",
+    "Today we are going to talk about prime numbers.",
+    "Euler proved that there are infinitely many of them.",
+    "But how are they distributed along the number line?",
+    "Gauss noticed a pattern when he was still a teenager.",
+    "Let's start with a simple example.",
+    "Take every number from one to one hundred.",
+    "Now cross out every multiple of two, except two itself.",
+    "Thank you.",
+    "We will come back to this in a moment.",
+    "The density of primes decreases slowly, like one over the logarithm.",
+    "If you enjoyed this video, please leave a comment below.",
+]
+
+
+# -----------------------------
+# Quality metric
+# -----------------------------
+def chrf(hypothesis, reference, max_order=6, beta=2):
+    """Character n-gram F-score (chrF) of one hypothesis against one reference, 0-100."""
+    hypothesis = hypothesis.replace(" ", "")
+    reference = reference.replace(" ", "")
+    precisions, recalls = [], []
+    for n in range(1, max_order + 1):
+        hyp = Counter(hypothesis[i:i + n] for i in range(len(hypothesis) - n + 1))
+        ref = Counter(reference[i:i + n] for i in range(len(reference) - n + 1))
+        if not hyp or not ref:
+            continue
+        overlap = sum((hyp & ref).values())
+        precisions.append(overlap / sum(hyp.values()))
+        recalls.append(overlap / sum(ref.values()))
+    if not precisions:
+        return 100.0 if hypothesis == reference else 0.0
+
+    precision = sum(precisions) / len(precisions)
+    recall = sum(recalls) / len(recalls)
+    if precision + recall == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+# -----------------------------
+# Translation backends
+# -----------------------------
+def bench_translation(args):
+    """
+    Compares the translation backends on every supported target language.
+    Quality is the chrF of each backend's output against the torch output,
+    so the torch row is 100 by definition.
+    """
+    from translators import BACKENDS, load_translator
+    from video_subtitles_translator import get_supported_languages
+
+    texts = [cue["text"] for cue in read_subtitles(args.srt)] if args.srt else SAMPLE_TEXTS
+    texts = texts * args.repeat
+    languages = args.languages or [l for l in get_supported_languages() if l != args.source]
+
+    print(f"{'pair':<8} {'backend':<12} {'load s':>8} {'seg/s':>8} {'chrF':>6}")
+    for tgt_lang in languages:
+        reference = None
+        for backend in BACKENDS:
+            try:
+                start = time.perf_counter()
+                translator = load_translator(args.source, tgt_lang, backend=backend, beam_size=args.beam_size)
+                # CTranslate2 loads the converted model on its first batch.
+                translator.translate_batch(texts[:1])
+                load_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                outputs = translator.translate(texts, desc=f"{args.source}-{tgt_lang} {backend}")
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                print(f"{args.source}-{tgt_lang:<5} {backend:<12} failed: {e}")
+                continue
+
+            if reference is None:
+                reference = outputs
+            score = sum(chrf(h, r) for h, r in zip(outputs, reference)) / len(outputs)
+            print(f"{args.source}-{tgt_lang:<5} {backend:<12} {load_time:>8.1f} "
+                  f"{len(texts) / elapsed:>8.1f} {score:>6.1f}")
+
+
+# -----------------------------
+# Translation worker processes
+# -----------------------------
+def process_memory_mb():
+    """
+    Returns (RSS, PSS) in MB summed over this process and its children, or
+    None without psutil. RSS counts shared model pages once per process; PSS
+    splits them between the processes that share them. PSS is Linux-only.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    parent = psutil.Process()
+    rss = pss = 0
+    for process in [parent] + parent.children(recursive=True):
+        info = process.memory_full_info()
+        rss += info.rss
+        pss += getattr(info, "pss", info.uss)
+    return rss / 2 ** 20, pss / 2 ** 20
+
+
+def bench_translation_workers(args):
+    """
+    Translates the same input with 1 (the single-process path) and more
+    worker processes, and reports throughput and memory for each.
+    """
+    from resources import available_cores
+    from translators import load_translator
+
+    texts = [cue["text"] for cue in read_subtitles(args.srt)] if args.srt else SAMPLE_TEXTS
+    texts = texts * args.repeat
+    threads = args.threads or available_cores()
+    if process_memory_mb() is None:
+        print("Note: install psutil ('pip install psutil') to report memory use.")
+
+    print(f"{'workers':>7} {'threads':>7} {'seg/s':>8} {'speedup':>7} {'RSS MB':>8} {'PSS MB':>8}")
+    baseline = None
+    for workers in args.workers:
+        translator = load_translator(
+            args.source, args.target, backend="torch", beam_size=args.beam_size, threads=threads, workers=workers
+        )
+        try:
+            start = time.perf_counter()
+            translator.translate(texts, desc=f"{workers} worker(s)")
+            elapsed = time.perf_counter() - start
+            memory = process_memory_mb()
+        finally:
+            translator.close()
+
+        rate = len(texts) / elapsed
+        baseline = baseline or rate
+        rss, pss = memory or (float("nan"), float("nan"))
+        print(f"{workers:>7} {threads:>7} {rate:>8.1f} {rate / baseline:>6.2f}x {rss:>8.0f} {pss:>8.0f}")
+
+
+# -----------------------------
+# Transcription speed presets
+# -----------------------------
+def bench_transcription(args):
+    """
+    Transcribes each clip with every speed preset and reports the real-time
+    factor (processing time / audio duration, including model load).
+    """
+    from speed_presets import SPEED_PRESETS, transcribe_options
+    from stages import extract_audio, transcribe_audio
+
+    presets = args.presets or list(SPEED_PRESETS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'clip':<30} {'preset':<10} {'audio s':>8} {'time s':>8} {'RTF':>6} {'segs':>5}")
+        for clip in args.clips:
+            audio_path = clip
+            if not clip.lower().endswith(".wav"):
+                audio_path = os.path.join(tmp_dir, f"{Path(clip).stem}.wav")
+                extract_audio(clip, audio_path)
+            with wave.open(audio_path, "rb") as wav:
+                duration = wav.getnframes() / wav.getframerate()
+
+            for preset in presets:
+                start = time.perf_counter()
+                segments, _ = transcribe_audio(
+                    audio_path, model_size=args.model_size, options=transcribe_options(preset)
+                )
+                elapsed = time.perf_counter() - start
+                print(f"{Path(clip).name[:30]:<30} {preset:<10} {duration:>8.1f} "
+                      f"{elapsed:>8.1f} {elapsed / duration:>6.3f} {len(segments):>5}")
+
+
+# -----------------------------
+# Segment storage
+# -----------------------------
+def bench_segment_store(args):
+    """
+    Compares a list of segment dicts with a SegmentStore: memory, SRT
+    formatting, and serialized size and round-trip time (pickle for the
+    list, the store's binary layout for the store).
+    """
+    import pickle
+    import random
+    import tracemalloc
+
+    from segment_store import SegmentStore
+    from subtitle_io import format_srt
+
+    if args.srt:
+        segments = read_subtitles(args.srt)
+    else:
+        # Roughly a multi-hour talk: short cues, some lines repeated.
+        random.seed(0)
+        segments, start = [], 0.0
+        for _ in range(args.count):
+            duration = random.uniform(0.5, 4.0)
+            segments.append({"start": start, "end": start + duration, "text": f" {random.choice(SAMPLE_TEXTS)}"})
+            start += duration + random.uniform(0.0, 0.5)
+
+    def measure(build):
+        tracemalloc.start()
+        value = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return value, memory / 2 ** 20
+
+    def timed(func):
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+    as_list, list_memory = measure(lambda: [dict(segment) for segment in segments])
+    store, store_memory = measure(lambda: SegmentStore.from_segments(segments))
+
+    _, list_format = timed(lambda: format_srt(as_list))
+    _, store_format = timed(lambda: format_srt(store))
+    list_bytes, list_dump = timed(lambda: pickle.dumps(as_list, protocol=pickle.HIGHEST_PROTOCOL))
+    _, list_load = timed(lambda: pickle.loads(list_bytes))
+    store_bytes, store_dump = timed(store.to_bytes)
+    _, store_load = timed(lambda: SegmentStore.from_bytes(store_bytes))
+
+    print(f"{len(segments)} segments, {len(store.text_table)} unique texts")
+    print(f"{'container':<14} {'memory MB':>10} {'SRT s':>8} {'size MB':>8} {'save s':>8} {'load s':>8}")
+    for name, memory, formatting, size, dump, load in (
+        ("list of dicts", list_memory, list_format, len(list_bytes), list_dump, list_load),
+        ("SegmentStore", store_memory, store_format, len(store_bytes), store_dump, store_load),
+    ):
+        print(f"{name:<14} {memory:>10.1f} {formatting:>8.3f} {size / 2 ** 20:>8.1f} {dump:>8.3f} {load:>8.3f}")
+
+
+# -----------------------------
+# Multi-rendition burn-in
+# -----------------------------
+def bench_renditions(args):
+    """
+    Burns the renditions in one pass, then once per rendition (one decode
+    each), and compares wall time and ffmpeg CPU time.
+    """
+    from utils import child_cpu_seconds
+    from stages import RENDITIONS, burn_subtitles_renditions
+
+    renditions = args.renditions or list(RENDITIONS)[:3]
+    if child_cpu_seconds() is None:
+        print("Note: child CPU time is not available on this platform; only wall time is reported.")
+
+    def timed(names, output_base):
+        cpu_before = child_cpu_seconds()
+        start = time.perf_counter()
+        burn_subtitles_renditions(args.video, args.srt, output_base, names)
+        wall = time.perf_counter() - start
+        cpu = child_cpu_seconds() - cpu_before if cpu_before is not None else float("nan")
+        return wall, cpu
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        single_wall, single_cpu = timed(renditions, os.path.join(tmp_dir, "single"))
+
+        separate_wall = separate_cpu = 0.0
+        for name in renditions:
+            wall, cpu = timed([name], os.path.join(tmp_dir, "separate"))
+            separate_wall += wall
+            separate_cpu += cpu
+
+    print(f"{'mode':<24} {'wall s':>8} {'CPU s':>8}")
+    print(f"{'one pass (' + str(len(renditions)) + ' outputs)':<24} {single_wall:>8.1f} {single_cpu:>8.1f}")
+    print(f"{str(len(renditions)) + ' separate runs':<24} {separate_wall:>8.1f} {separate_cpu:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and quality benchmarks for the subtitle pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    translation = subparsers.add_parser("translation", help="Compare translation backends across languages.")
+    translation.add_argument("--source", "-s", type=str, default="en", help="Source language code.")
+    translation.add_argument("--languages", "-l", nargs="*", default=None, help="Target language codes (default: all supported).")
+    translation.add_argument("--srt", type=str, default=None, help="Optional: SRT/VTT/ASS file whose cues are used as input.")
+    translation.add_argument("--repeat", type=int, default=4, help="Repeat the input this many times.")
+    # Left unset, torch would use the model's generation config (usually 4 beams) and
+    # CTranslate2 its default of 2, mixing the beam difference into the int8 comparison.
+    translation.add_argument("--beam-size", type=int, default=4, help="Beam size used by both backends (default: 4).")
+    translation.set_defaults(func=bench_translation)
+
+    workers = subparsers.add_parser("translation-workers", help="Compare one and several translation processes.")
+    workers.add_argument("--source", "-s", type=str, default="en", help="Source language code.")
+    workers.add_argument("--target", "-t", type=str, default="he", help="Target language code.")
+    workers.add_argument("--workers", "-w", nargs="+", type=int, default=[1, 2, 4],
+                         help="Worker counts to run; 1 is the single-process path.")
+    workers.add_argument("--threads", type=int, default=None, help="Total torch threads (default: every core).")
+    workers.add_argument("--srt", type=str, default=None, help="Optional: SRT/VTT/ASS file whose cues are used as input.")
+    workers.add_argument("--repeat", type=int, default=20, help="Repeat the input this many times.")
+    workers.add_argument("--beam-size", type=int, default=None, help="Optional: Beam size.")
+    workers.set_defaults(func=bench_translation_workers)
+
+    transcription = subparsers.add_parser("transcription", help="Compare transcription speed presets.")
+    transcription.add_argument("clips", nargs="+", help="Video files or 16 kHz mono WAV files.")
+    transcription.add_argument("--presets", "-p", nargs="*", default=None, help="Presets to run (default: all).")
+    transcription.add_argument("--model-size", type=str, default="small", help="Whisper model size.")
+    transcription.set_defaults(func=bench_transcription)
+
+    store = subparsers.add_parser("segments", help="Compare segment dicts with the columnar SegmentStore.")
+    store.add_argument("--count", "-n", type=int, default=100000, help="Number of synthetic segments.")
+    store.add_argument("--srt", type=str, default=None, help="Optional: SRT/VTT/ASS file to use instead.")
+    store.set_defaults(func=bench_segment_store)
+
+    renditions = subparsers.add_parser("renditions", help="Compare one-pass multi-rendition burn-in with separate runs.")
+    renditions.add_argument("video", help="Source video.")
+    renditions.add_argument("srt", help="SRT file to burn in.")
+    renditions.add_argument("--renditions", "-r", nargs="*", default=None,
+                            help="Rendition names from stages.RENDITIONS (default: 1080p 720p 480p).")
+    renditions.set_defaults(func=bench_renditions)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
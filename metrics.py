@@ -0,0 +1,230 @@
+"""
+Counters and histograms for long-running throughput monitoring.
+
+Pipeline stages update the metrics below; they can be exported in the
+Prometheus text format to a file (for node_exporter's textfile collector)
+and/or served over HTTP at /metrics. For example, media-seconds per hour by
+stage is `rate(subtitles_media_seconds_total[1h]) * 3600`.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from atomic_files import atomic_path
+
+
+# --- CONFIGURATION ---
+# Used when start_exporters() is not given a file or port.
+TEXTFILE_ENV = "SUBTITLES_METRICS_FILE"
+PORT_ENV = "SUBTITLES_METRICS_PORT"
+TEXTFILE_INTERVAL_SECONDS = 15
+# ---------------------
+
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+SPEED_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+    def write_textfile(self, path):
+        """Writes the metrics to a temporary file, then moves it into place."""
+        with atomic_path(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+
+
+REGISTRY = Registry()
+
+# -----------------------------
+# Pipeline metrics
+# -----------------------------
+MEDIA_SECONDS = REGISTRY.register(Counter(
+    "subtitles_media_seconds_total", "Seconds of media processed, by stage.", ["stage"]))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "subtitles_stage_duration_seconds", "Wall time of each stage run.", ["stage"]))
+STAGE_RUNS = REGISTRY.register(Counter(
+    "subtitles_stage_runs_total", "Stage runs, by stage and result (ok/failed).", ["stage", "result"]))
+MODEL_LOADS = REGISTRY.register(Counter(
+    "subtitles_model_loads_total", "Models loaded, by kind (whisper/translation) and name.", ["kind", "model"]))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "subtitles_cache_lookups_total", "Cache lookups, by cache and result (hit/miss).", ["cache", "result"]))
+FFMPEG_SPEED = REGISTRY.register(Histogram(
+    "subtitles_ffmpeg_speed_ratio", "ffmpeg's final speed multiplier (media time / wall time).",
+    ["step"], buckets=SPEED_BUCKETS))
+QUEUE_JOBS = REGISTRY.register(Gauge(
+    "subtitles_queue_jobs", "Jobs in the shared work queue, by state.", ["state"]))
+
+
+class StageRun:
+    """Set media_seconds inside a track_stage block to count the media it processed."""
+
+    def __init__(self):
+        self.media_seconds = None
+
+
+@contextmanager
+def track_stage(stage):
+    """Times a stage run and counts it as ok or failed, plus the media seconds it processed."""
+    run = StageRun()
+    start = time.perf_counter()
+    try:
+        yield run
+    except (Exception, SystemExit):
+        STAGE_RUNS.inc(stage=stage, result="failed")
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage)
+    STAGE_RUNS.inc(stage=stage, result="ok")
+    if run.media_seconds:
+        MEDIA_SECONDS.inc(run.media_seconds, stage=stage)
+
+
+# -----------------------------
+# Exporters
+# -----------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the pipeline's console output.
+        pass
+
+
+def start_http_server(port, addr="127.0.0.1"):
+    """Serves /metrics from a background thread. Returns the server."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_textfile_writer(path, interval=TEXTFILE_INTERVAL_SECONDS):
+    """Rewrites the metrics file every interval seconds and once more at exit."""
+    def run():
+        while True:
+            time.sleep(interval)
+            REGISTRY.write_textfile(path)
+
+    threading.Thread(target=run, daemon=True).start()
+    atexit.register(REGISTRY.write_textfile, path)
+
+
+def start_exporters(textfile=None, port=None):
+    """Starts the exporters asked for, falling back to SUBTITLES_METRICS_FILE / SUBTITLES_METRICS_PORT."""
+    textfile = textfile or os.environ.get(TEXTFILE_ENV)
+    port = port or os.environ.get(PORT_ENV)
+    if textfile:
+        start_textfile_writer(textfile)
+        print(f"Writing metrics to {textfile}")
+    if port:
+        start_http_server(int(port))
+        print(f"Serving metrics at http://127.0.0.1:{port}/metrics")
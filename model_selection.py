@@ -0,0 +1,174 @@
+import time
+import wave
+
+import numpy as np
+from faster_whisper import WhisperModel
+
+from resources import SCHEDULER
+from metrics import MODEL_LOADS
+
+
+# --- CONFIGURATION ---
+# Whisper sizes from smallest to largest.
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large-v3"]
+
+# Approximate CPU decoding cost of each size relative to "tiny" (int8).
+# The probe measures "tiny" on this machine; the others are scaled from it.
+RELATIVE_COST = {
+    "tiny": 1.0,
+    "base": 1.8,
+    "small": 4.5,
+    "medium": 11.0,
+    "large-v3": 22.0,
+}
+
+PROBE_WINDOW_SECONDS = 30
+# Estimates are multiplied by this before comparing against the budget.
+SAFETY_FACTOR = 1.2
+# Used when "auto" is requested without a deadline or RTF target.
+DEFAULT_RTF_TARGET = 1.0
+# The probe's language is reused for the real run above this probability.
+LANGUAGE_CONFIDENCE = 0.8
+# A probe window with less speech than this (silence, music) says nothing
+# about decoding speed, and FALLBACK_MODEL_SIZE is used instead.
+MIN_PROBE_SPEECH_SECONDS = 5
+FALLBACK_MODEL_SIZE = "base"
+# ---------------------
+
+
+# -----------------------------
+# Probe
+# -----------------------------
+def read_wav_window(audio_path, window_seconds):
+    """
+    Reads a window of a 16 kHz, 16-bit mono WAV file (as written by
+    extract_audio) as float32 samples, starting 10% into the file to
+    skip intros. Returns (samples, total_duration).
+    """
+    with wave.open(str(audio_path), "rb") as wav:
+        rate = wav.getframerate()
+        total_frames = wav.getnframes()
+        window_frames = min(total_frames, int(window_seconds * rate))
+        start = min(total_frames // 10, total_frames - window_frames)
+        wav.setpos(start)
+        frames = wav.readframes(window_frames)
+
+    samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    return samples, total_frames / rate
+
+
+def probe_throughput(audio_path, window_seconds=PROBE_WINDOW_SECONDS, options=None):
+    """
+    Transcribes a short window with the "tiny" model and measures its
+    real-time factor (processing seconds per second of speech) on this
+    machine. options are the transcribe arguments of the run being planned,
+    so the probe reflects its speed preset. With the VAD filter on, only the
+    speech it kept is counted, so a window of music does not look free to
+    decode. Also returns the detected language.
+    """
+    samples, duration = read_wav_window(audio_path, window_seconds)
+    window = len(samples) / 16000
+
+    with SCHEDULER.stage("probe") as grant:
+        model = WhisperModel("tiny", device="cpu", compute_type="int8", cpu_threads=grant.threads)
+        MODEL_LOADS.inc(kind="whisper", model="tiny")
+
+        start = time.perf_counter()
+        segments, info = model.transcribe(samples, **(options or {"beam_size": 5}))
+        # Segments are decoded lazily.
+        decoded = "".join(segment.text for segment in segments).strip()
+        elapsed = time.perf_counter() - start
+
+    speech = window
+    if (options or {}).get("vad_filter"):
+        speech = getattr(info, "duration_after_vad", window)
+    if not decoded:
+        speech = 0.0
+
+    return {
+        "audio_duration": round(duration, 2),
+        "probe_window": round(window, 2),
+        "speech_seconds": round(speech, 2),
+        "probe_seconds": round(elapsed, 2),
+        "probe_rtf": elapsed / speech if speech else 0.0,
+        "threads": grant.threads,
+        "language": info.language,
+        "language_probability": round(info.language_probability, 3),
+    }
+
+
+# -----------------------------
+# Selection
+# -----------------------------
+def choose_model_size(probe_rtf, audio_duration, deadline=None, rtf_target=None):
+    """
+    Picks the largest model whose estimated RTF meets the target. A deadline
+    (seconds for the whole transcription) is turned into an RTF target.
+    Returns (model_size, estimated_rtf_by_size, target_rtf).
+    """
+    if deadline:
+        target_rtf = deadline / audio_duration if audio_duration else float("inf")
+        if rtf_target:
+            target_rtf = min(target_rtf, rtf_target)
+    else:
+        target_rtf = rtf_target or DEFAULT_RTF_TARGET
+
+    estimates = {
+        size: probe_rtf * RELATIVE_COST[size] / RELATIVE_COST["tiny"] * SAFETY_FACTOR
+        for size in MODEL_SIZES
+    }
+
+    chosen = MODEL_SIZES[0]
+    for size in MODEL_SIZES:
+        if estimates[size] <= target_rtf:
+            chosen = size
+    return chosen, estimates, target_rtf
+
+
+def select_model_size(audio_path, deadline=None, rtf_target=None, options=None):
+    """
+    Runs the probe, chooses a model size and logs the decision.
+    Returns (model_size, decision) where decision records the measured basis.
+    """
+    print("Probing transcription speed with the 'tiny' model...")
+    probe = probe_throughput(audio_path, options=options)
+    if probe["speech_seconds"] < MIN_PROBE_SPEECH_SECONDS:
+        decision = dict(probe)
+        decision.update({
+            "deadline": deadline,
+            "target_rtf": rtf_target,
+            "estimated_rtf": None,
+            "model_size": FALLBACK_MODEL_SIZE,
+            "fallback": "too little speech in the probe window",
+        })
+        print(f"Probe: only {probe['speech_seconds']}s of speech in the {probe['probe_window']}s window, "
+              f"too little to measure; using the '{FALLBACK_MODEL_SIZE}' model")
+        return FALLBACK_MODEL_SIZE, decision
+
+    model_size, estimates, target_rtf = choose_model_size(
+        probe["probe_rtf"], probe["audio_duration"], deadline, rtf_target
+    )
+
+    decision = dict(probe)
+    decision.update({
+        "deadline": deadline,
+        "target_rtf": round(target_rtf, 3),
+        "estimated_rtf": {size: round(rtf, 3) for size, rtf in estimates.items()},
+        "model_size": model_size,
+    })
+
+    print(f"Probe: tiny model ran at RTF {probe['probe_rtf']:.3f} on {probe['speech_seconds']}s of speech "
+          f"({probe['threads']} threads), detected '{probe['language']}' ({probe['language_probability']:.2f})")
+    print(f"Target RTF {target_rtf:.3f} for {probe['audio_duration']}s of audio; "
+          f"estimated RTF: " + ", ".join(f"{s}={r:.2f}" for s, r in estimates.items()))
+    print(f"Selected model size: '{model_size}' "
+          f"(estimated {estimates[model_size] * probe['audio_duration']:.0f}s to transcribe)")
+
+    return model_size, decision
+
+
+def probe_language(decision):
+    """Returns the probe's language if it is confident enough to skip detection, else None."""
+    if decision and decision["language_probability"] >= LANGUAGE_CONFIDENCE:
+        return decision["language"]
+    return None
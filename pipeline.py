@@ -0,0 +1,265 @@
+"""
+A small executor for pipelines declared as a graph of stages.
+
+Each stage names the artifacts it reads and the artifacts it produces.
+`StageGraph.run` works backwards from the artifacts asked for, so only the
+stages that are needed run, and runs every stage whose inputs are ready at
+the same time (up to `max_parallel`). CPU threads within those stages are
+still divided by the ResourceScheduler.
+
+Stages marked `cache=True` store their outputs in the stage cache. A
+stage's cache key is built from the keys of its inputs: files given to the
+graph are keyed by path, size and mtime, plain values by their contents,
+and produced artifacts by the key of the stage that produced them. Keys are
+therefore known before anything runs, and a cached stage's own inputs (and
+the stages upstream of them) are skipped entirely.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from atomic_files import atomic_path
+from metrics import CACHE_LOOKUPS
+from resources import max_parallel_stages
+
+
+# --- CONFIGURATION ---
+STAGE_CACHE_DIR = Path(os.environ.get(
+    "SUBTITLES_STAGE_CACHE",
+    Path.home() / ".cache" / "subtitles" / "stages"
+))
+# ---------------------
+
+
+class Stage:
+    """
+    One step of a pipeline. func is called with the input artifacts, in the
+    order of inputs, and returns the single output, or a tuple with one
+    item per output. Bump version when a change to func invalidates its
+    cached results.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), cache=False, version=1):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.cache = cache
+        self.version = version
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+
+def _hash(*parts):
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _value_key(value):
+    return _hash("value", json.dumps(value, sort_keys=True, default=repr))
+
+
+def _file_key(path):
+    path = Path(path).resolve()
+    stat = path.stat()
+    return _hash("file", str(path), str(stat.st_size), str(stat.st_mtime_ns))
+
+
+class StageCache:
+    """Stage outputs pickled in a directory, one file per cache key."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir or STAGE_CACHE_DIR)
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def load(self, key):
+        """Returns the cached outputs for key, or None."""
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def store(self, key, outputs):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_path(path) as tmp_path, open(tmp_path, "wb") as f:
+            pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class StageGraph:
+    """A set of stages wired together by artifact name."""
+
+    def __init__(self):
+        self.stages = {}
+        self._values = {}
+        self._keys = {}
+        self._producers = {}
+        # One entry per stage that ran or was answered by the cache, for the job report.
+        self.timeline = []
+
+    def value(self, name, value):
+        """Provides an artifact up front."""
+        self._add_artifact(name, None)
+        self._values[name] = value
+        self._keys[name] = _value_key(value)
+
+    def file(self, name, path):
+        """Provides an existing file as an artifact; its key follows the file's size and mtime."""
+        self._add_artifact(name, None)
+        self._values[name] = str(path)
+        self._keys[name] = _file_key(path)
+
+    def add(self, name, func, inputs=(), outputs=(), cache=False, version=1):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage '{name}'")
+        stage = Stage(name, func, inputs, outputs, cache, version)
+        for output in stage.outputs:
+            self._add_artifact(output, stage)
+        self.stages[name] = stage
+        return stage
+
+    def _add_artifact(self, name, stage):
+        if name in self._producers:
+            raise ValueError(f"Artifact '{name}' is produced twice")
+        self._producers[name] = stage
+
+    # -----------------------------
+    # Planning
+    # -----------------------------
+    def _stage_keys(self):
+        """Computes every stage's cache key (and so every artifact's key) in dependency order."""
+        keys = dict(self._keys)
+        stage_keys = {}
+        visiting = set()
+
+        def visit(stage):
+            if stage.name in stage_keys:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Stage '{stage.name}' is part of a dependency cycle")
+            visiting.add(stage.name)
+            for name in stage.inputs:
+                if name not in self._producers:
+                    raise ValueError(f"Stage '{stage.name}' needs '{name}', which nothing provides")
+                producer = self._producers[name]
+                if producer is not None:
+                    visit(producer)
+            visiting.discard(stage.name)
+
+            key = _hash("stage", stage.name, str(stage.version), *(f"{n}={keys[n]}" for n in stage.inputs))
+            stage_keys[stage.name] = key
+            for output in stage.outputs:
+                keys[output] = _hash(key, output)
+
+        for stage in self.stages.values():
+            visit(stage)
+        return stage_keys
+
+    def _plan(self, targets, stage_keys, cache):
+        """Returns (stages to run, cached outputs by stage) needed for the targets."""
+        needed, cached = set(), {}
+
+        def demand(name):
+            if name not in self._producers:
+                raise ValueError(f"Nothing provides '{name}'")
+            stage = self._producers[name]
+            if stage is None or stage.name in needed or stage.name in cached:
+                return
+            if stage.cache and cache is not None:
+                outputs = cache.load(stage_keys[stage.name])
+                CACHE_LOOKUPS.inc(cache="stage_artifacts", result="miss" if outputs is None else "hit")
+                if outputs is not None:
+                    cached[stage.name] = outputs
+                    return
+            needed.add(stage.name)
+            for input_name in stage.inputs:
+                demand(input_name)
+
+        for target in targets:
+            demand(target)
+        return needed, cached
+
+    # -----------------------------
+    # Execution
+    # -----------------------------
+    def run(self, targets, max_parallel=None, cache=None):
+        """
+        Produces the target artifacts and returns them, with the values the
+        graph was given, by name. cache is a StageCache, or None to run
+        without one. Other artifacts are dropped as soon as every stage that
+        reads them has finished, so large ones (loaded models) are freed
+        during the run.
+        """
+        stage_keys = self._stage_keys()
+        pending, cached = self._plan(targets, stage_keys, cache)
+
+        # How many of the stages still to run read each artifact.
+        readers = {}
+        for name in pending:
+            for input_name in self.stages[name].inputs:
+                readers[input_name] = readers.get(input_name, 0) + 1
+        keep = set(targets) | set(self._values)
+
+        artifacts = dict(self._values)
+        for name, outputs in cached.items():
+            artifacts.update(zip(self.stages[name].outputs, outputs))
+            self.timeline.append({"stage": name, "seconds": 0.0, "cached": True})
+            print(f"[{name}] using cached result")
+
+        started = time.monotonic()
+        lock = threading.Lock()
+
+        def execute(stage):
+            print(f"[{stage.name}] starting")
+            start = time.monotonic()
+            result = stage.func(*(artifacts[name] for name in stage.inputs))
+            outputs = result if len(stage.outputs) > 1 else (result,)
+            if len(outputs) != len(stage.outputs):
+                raise ValueError(f"Stage '{stage.name}' returned {len(outputs)} outputs, "
+                                 f"expected {len(stage.outputs)}")
+            if stage.cache and cache is not None:
+                cache.store(stage_keys[stage.name], tuple(outputs))
+            with lock:
+                self.timeline.append({
+                    "stage": stage.name,
+                    "started_at": round(start - started, 2),
+                    "seconds": round(time.monotonic() - start, 2),
+                    "cached": False,
+                })
+            return outputs
+
+        with ThreadPoolExecutor(max_workers=max_parallel or max_parallel_stages()) as executor:
+            running = {}
+            try:
+                while pending or running:
+                    # In declaration order, so earlier (upstream) stages get the free slots first.
+                    ready = [name for name in self.stages if name in pending
+                             and all(input_name in artifacts for input_name in self.stages[name].inputs)]
+                    for name in ready:
+                        pending.discard(name)
+                        running[executor.submit(execute, self.stages[name])] = name
+                    if not running:
+                        raise RuntimeError(f"Stages {sorted(pending)} can never run")
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        artifacts.update(zip(self.stages[name].outputs, future.result()))
+                        for input_name in self.stages[name].inputs:
+                            readers[input_name] -= 1
+                            if not readers[input_name] and input_name not in keep:
+                                del artifacts[input_name]
+            finally:
+                # On failure, let the stages already running finish, but start no more.
+                for future in running:
+                    future.cancel()
+
+        return artifacts
@@ -0,0 +1,279 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+# --- CONFIGURATION ---
+# Relative CPU demand of each pipeline stage. When stages run at the same
+# time the available cores are split between them in proportion to these.
+STAGE_WEIGHTS = {
+    "probe": 1,
+    "extract": 1,
+    "load": 1,
+    "transcribe": 4,
+    "translate": 3,
+    "burn": 3,
+}
+
+# Cap on the cores one job may use, e.g. "4" to run two jobs side by side
+# on an 8-core machine. Unset means every core the process may run on.
+MAX_THREADS_ENV = "SUBTITLES_MAX_THREADS"
+
+# Jobs running at the same time on one machine (several workers, a second
+# UI run) find each other through lock files here and split the cores
+# evenly. Set it to an empty string to turn this off.
+RUNTIME_DIR_ENV = "SUBTITLES_RUNTIME_DIR"
+DEFAULT_RUNTIME_DIR = Path(tempfile.gettempdir()) / "subtitles-jobs"
+
+# How many pipeline stages may run at once (e.g. loading a translation model
+# while Whisper transcribes, or burning two languages side by side). The
+# running stages split the cores above between them.
+MAX_PARALLEL_STAGES = 3
+MAX_PARALLEL_STAGES_ENV = "SUBTITLES_MAX_PARALLEL_STAGES"
+# ---------------------
+
+
+def available_cores():
+    """Returns the number of cores this process may use."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on Windows/macOS
+        cores = os.cpu_count() or 1
+
+    limit = os.environ.get(MAX_THREADS_ENV)
+    if limit:
+        cores = min(cores, max(1, int(limit)))
+    return cores
+
+
+def max_parallel_stages():
+    """Returns how many pipeline stages may run at the same time."""
+    limit = os.environ.get(MAX_PARALLEL_STAGES_ENV)
+    return max(1, int(limit)) if limit else MAX_PARALLEL_STAGES
+
+
+def _try_lock(f):
+    """Takes an exclusive lock on an open file without waiting. Returns False if another process holds it."""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class MachineLeases:
+    """
+    Counts the jobs running on this machine. A process holds an exclusive
+    lock on its own file in the runtime directory while it has stages
+    running; the operating system drops the lock if the process dies, so
+    only locked files count.
+    """
+
+    # Unlocked files older than this were left behind by a crashed process.
+    STALE_SECONDS = 60
+
+    def __init__(self, runtime_dir):
+        self.runtime_dir = Path(runtime_dir)
+        self.path = None
+        self._file = None
+
+    def acquire(self):
+        if self._file is not None:
+            return
+        try:
+            self.runtime_dir.mkdir(parents=True, exist_ok=True)
+            path = self.runtime_dir / f"{os.getpid()}-{uuid.uuid4().hex}.lock"
+            f = open(path, "w+b")
+        except OSError:
+            # No usable runtime directory: run without coordinating.
+            return
+        f.write(b"\0")
+        f.flush()
+        if _try_lock(f):
+            self.path, self._file = path, f
+        else:
+            f.close()
+
+    def release(self):
+        if self._file is None:
+            return
+        _unlock(self._file)
+        self._file.close()
+        self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def running_jobs(self):
+        """Returns the number of jobs holding a lease, counting this one."""
+        if self._file is None:
+            return 1
+
+        jobs = 1
+        now = time.time()
+        for path in self.runtime_dir.glob("*.lock"):
+            if path == self.path:
+                continue
+            try:
+                with open(path, "r+b") as f:
+                    if not _try_lock(f):
+                        jobs += 1
+                        continue
+                    _unlock(f)
+                if now - path.stat().st_mtime > self.STALE_SECONDS:
+                    os.remove(path)
+            except OSError:
+                # Released (or being cleaned up) while we looked.
+                continue
+        return jobs
+
+
+def _default_leases():
+    runtime_dir = os.environ.get(RUNTIME_DIR_ENV, str(DEFAULT_RUNTIME_DIR))
+    return MachineLeases(runtime_dir) if runtime_dir else None
+
+
+class ThreadGrant:
+    """The thread budget granted to one running stage."""
+
+    def __init__(self, stage, weight, on_rebalance=None):
+        self.stage = stage
+        self.weight = weight
+        self.threads = 1
+        self.on_rebalance = on_rebalance
+
+    def __repr__(self):
+        return f"ThreadGrant(stage={self.stage!r}, threads={self.threads})"
+
+
+class ResourceScheduler:
+    """
+    Splits the machine's cores between the pipeline stages that are running.
+
+    Each stage asks for a budget with `stage()`. Whenever a stage starts or
+    finishes, the cores are redistributed by weight across the active stages
+    that can change their thread count while running (torch), which set an
+    `on_rebalance` callback. The others (Whisper, ffmpeg) keep the threads
+    they started with, and only the cores they leave are shared out. Every
+    allocation is recorded for the job report.
+
+    While any stage runs, the process holds a machine lease (see
+    MachineLeases), and the cores are first split evenly between the jobs
+    holding one. Other jobs starting or finishing are noticed at this
+    job's next stage start or end.
+    """
+
+    def __init__(self, total_cores=None, leases=None):
+        self.total_cores = total_cores or available_cores()
+        self.leases = leases
+        self.job_cores = self.total_cores
+        self._lock = threading.Lock()
+        self._active = []
+        self.start_job()
+
+    def start_job(self):
+        """Starts a new allocation log; call at the start of each job."""
+        with self._lock:
+            self._started = time.monotonic()
+            self.allocations = []
+
+    @contextmanager
+    def stage(self, name, weight=None, on_rebalance=None):
+        grant = ThreadGrant(name, weight or STAGE_WEIGHTS.get(name, 1), on_rebalance)
+        with self._lock:
+            if self.leases and not self._active:
+                self.leases.acquire()
+            self._active.append(grant)
+            changed = self._rebalance("start", grant)
+        self._notify(changed)
+        try:
+            yield grant
+        finally:
+            with self._lock:
+                self._active.remove(grant)
+                changed = self._rebalance("end", grant)
+                if self.leases and not self._active:
+                    self.leases.release()
+            self._notify(changed)
+
+    def _rebalance(self, event, grant):
+        """Recomputes the grants that can change. Returns the running ones whose budget changed."""
+        jobs = self.leases.running_jobs() if self.leases else 1
+        self.job_cores = max(1, self.total_cores // jobs)
+
+        # Running stages without on_rebalance fixed their thread count when they started.
+        flexible = [g for g in self._active if g is grant or g.on_rebalance]
+        fixed_threads = sum(g.threads for g in self._active if g not in flexible)
+        shares = self._shares(flexible, self.job_cores - fixed_threads)
+        changed = []
+        for active, threads in zip(flexible, shares):
+            if active.threads != threads:
+                active.threads = threads
+                if active is not grant:
+                    changed.append(active)
+
+        self.allocations.append({
+            "time": round(time.monotonic() - self._started, 3),
+            "event": event,
+            "stage": grant.stage,
+            "jobs_on_machine": jobs,
+            "threads": {active.stage: active.threads for active in self._active},
+        })
+        return changed
+
+    @staticmethod
+    def _shares(grants, cores):
+        """Splits cores between grants by weight (largest remainder), at least one thread each."""
+        if not grants:
+            return []
+
+        total_weight = sum(g.weight for g in grants)
+        exact = [max(0, cores) * g.weight / total_weight for g in grants]
+        shares = [max(1, int(x)) for x in exact]
+
+        spare = cores - sum(shares)
+        by_remainder = sorted(range(len(exact)), key=lambda i: exact[i] - int(exact[i]), reverse=True)
+        for i in by_remainder[:max(0, spare)]:
+            shares[i] += 1
+        return shares
+
+    def _notify(self, grants):
+        for grant in grants:
+            if grant.on_rebalance:
+                grant.on_rebalance(grant.threads)
+
+    def report(self):
+        """Returns the current job's core allocation history, for the job report."""
+        return {
+            "total_cores": self.total_cores,
+            "allocations": list(self.allocations),
+        }
+
+
+# One scheduler per process, shared by every stage.
+SCHEDULER = ResourceScheduler(leases=_default_leases())
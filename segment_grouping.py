@@ -0,0 +1,207 @@
+import re
+
+from segment_store import SegmentStore
+
+
+# --- CONFIGURATION ---
+# Consecutive segments are merged into one sentence unit until one ends a
+# sentence, the unit would exceed MAX_UNIT_CHARS, or the silence between
+# them is longer than MAX_GAP_SECONDS.
+MAX_UNIT_CHARS = 300
+MAX_GAP_SECONDS = 1.5
+# ---------------------
+
+SENTENCE_END = re.compile(r"[.!?…。！？؟][\"'”’)\]]*$")
+# "[Music]", "(applause)", "♪ ... ♪" and similar are never merged.
+NON_SPEECH = re.compile(r"^\s*([\[(♪].*[\])♪])\s*$")
+PUNCTUATION = re.compile(r"[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+# Scripts written without spaces between words (Chinese, Japanese, Thai, Lao,
+# Khmer, Myanmar), which are split between characters instead.
+UNSPACED_SCRIPT = re.compile(r"[\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]")
+
+
+def normalize_text(text):
+    """Lowercases and strips punctuation, so near-identical lines share one translation."""
+    return WHITESPACE.sub(" ", PUNCTUATION.sub("", text.lower())).strip()
+
+
+# -----------------------------
+# Sentence grouping
+# -----------------------------
+def _columns(segments):
+    """Returns the segments' starts, ends and stripped texts as three lists."""
+    if isinstance(segments, SegmentStore):
+        # Strip each unique text once and read the columns directly, without building a dict per segment.
+        table = [text.strip() for text in segments.text_table]
+        texts = [table[text_id] for text_id in segments.text_ids.tolist()]
+        return segments.starts.tolist(), segments.ends.tolist(), texts
+    return (
+        [segment["start"] for segment in segments],
+        [segment["end"] for segment in segments],
+        [segment["text"].strip() for segment in segments],
+    )
+
+
+def _group(starts, ends, texts, max_chars, max_gap):
+    # Repeated lines are common, so each distinct text is matched once:
+    # text -> (ends a sentence, is non-speech).
+    kinds = {}
+    for text in texts:
+        if text not in kinds:
+            non_speech = bool(NON_SPEECH.match(text))
+            kinds[text] = (non_speech or bool(SENTENCE_END.search(text)), non_speech)
+
+    groups = []
+    current = []
+    current_chars = 0
+
+    for i, text in enumerate(texts):
+        if current:
+            prev = current[-1]
+            if (kinds[texts[prev]][0]
+                    or kinds[text][1]
+                    or starts[i] - ends[prev] > max_gap
+                    or current_chars + len(text) + 1 > max_chars):
+                groups.append(current)
+                current = []
+                current_chars = 0
+
+        current.append(i)
+        current_chars += len(text) + 1
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+def group_sentences(segments, max_chars=MAX_UNIT_CHARS, max_gap=MAX_GAP_SECONDS):
+    """Returns lists of consecutive segment indices, one list per sentence unit."""
+    return _group(*_columns(segments), max_chars, max_gap)
+
+
+class TranslationPlan:
+    """
+    Maps subtitle segments to the de-duplicated sentence units sent to the model.
+
+    groups: segment indices of each sentence unit
+    texts: the unique model inputs
+    unit_to_text: for each group, the index of its input in texts
+    """
+
+    def __init__(self, groups, texts, unit_to_text):
+        self.groups = groups
+        self.texts = texts
+        self.unit_to_text = unit_to_text
+
+
+def plan_translation(segments, regroup=True):
+    """Groups segments into sentence units and collapses duplicate units."""
+    starts, ends, segment_texts = _columns(segments)
+    if regroup:
+        groups = _group(starts, ends, segment_texts, MAX_UNIT_CHARS, MAX_GAP_SECONDS)
+    else:
+        groups = [[i] for i in range(len(segments))]
+
+    texts = []
+    unit_to_text = []
+    seen = {}
+    for group in groups:
+        text = " ".join(segment_texts[i] for i in group)
+        # "[Music]" must not share a translation with a spoken "Music.", so tags are keyed as written.
+        key = text if NON_SPEECH.match(text) else normalize_text(text) or text
+        if key not in seen:
+            seen[key] = len(texts)
+            texts.append(text)
+        unit_to_text.append(seen[key])
+
+    return TranslationPlan(groups, texts, unit_to_text)
+
+
+# -----------------------------
+# Splitting translations back
+# -----------------------------
+def split_text(text, weights):
+    """
+    Splits text into len(weights) parts whose lengths are proportional to the
+    weights. Splits at spaces, or between characters for text in a script
+    written without spaces (e.g. Chinese and Japanese). If the text is too
+    short to fill every part, the trailing parts are empty.
+    """
+    if len(weights) == 1:
+        return [text]
+
+    total = sum(weights)
+    if total <= 0:
+        weights = [1] * len(weights)
+        total = len(weights)
+
+    words = text.split()
+    if len(words) >= len(weights):
+        tokens, joiner = words, " "
+    elif len(words) == 1 and UNSPACED_SCRIPT.search(text):
+        tokens, joiner = list(words[0]), ""
+        if len(tokens) < len(weights):
+            return tokens + [""] * (len(weights) - len(tokens))
+    else:
+        # Fewer words than parts: one word each, never splitting a word.
+        return words + [""] * (len(weights) - len(words))
+
+    # Cumulative character position at the end of each token.
+    ends = []
+    position = 0
+    for token in tokens:
+        position += len(token)
+        ends.append(position)
+
+    parts = []
+    start = 0
+    cumulative = 0
+    for n, weight in enumerate(weights[:-1]):
+        cumulative += weight
+        target = position * cumulative / total
+        # Cut after the token ending nearest the target, leaving at least
+        # one token for this part and for each remaining part.
+        remaining = len(weights) - n - 1
+        cut = min(
+            range(start + 1, len(tokens) - remaining + 1),
+            key=lambda k: abs(ends[k - 1] - target)
+        )
+        parts.append(joiner.join(tokens[start:cut]))
+        start = cut
+
+    parts.append(joiner.join(tokens[start:]))
+    return parts
+
+
+def apply_translations(segments, plan, translated_texts):
+    """
+    Spreads each translated unit across its segments in proportion to their
+    durations. A segment left with no text extends the previous one instead.
+    Returns a SegmentStore for a SegmentStore, otherwise a list of dicts.
+    """
+    if isinstance(segments, SegmentStore):
+        starts, ends = segments.starts.tolist(), segments.ends.tolist()
+    else:
+        starts = [segment["start"] for segment in segments]
+        ends = [segment["end"] for segment in segments]
+
+    # Output segment k runs from the start of segment rows[k] to the end of end_rows[k].
+    rows, end_rows, texts = [], [], []
+    for group, text_index in zip(plan.groups, plan.unit_to_text):
+        durations = [ends[i] - starts[i] for i in group]
+        parts = split_text(translated_texts[text_index], durations)
+        for n, (i, part) in enumerate(zip(group, parts)):
+            if n > 0 and not part:
+                end_rows[-1] = i
+                continue
+            rows.append(i)
+            end_rows.append(i)
+            texts.append(part)
+
+    if isinstance(segments, SegmentStore):
+        return segments.rebuild(rows, end_rows, texts)
+    return [
+        {"start": starts[i], "end": ends[j], "text": text}
+        for i, j, text in zip(rows, end_rows, texts)
+    ]
@@ -0,0 +1,214 @@
+"""
+A compact, columnar container for subtitle segments.
+
+Start and end times are float64 NumPy arrays and each segment's text is an
+index into a table of unique strings, so repeated lines ("[Music]",
+"Thank you.") are stored once. Slicing returns views that share the
+arrays, timestamps for SRT/VTT are formatted for all segments in one
+vectorized pass, and to_bytes()/save() write a flat binary layout that
+loads without parsing (also used when a store is pickled, e.g. into the
+stage cache or to another process).
+
+Indexing a single segment returns the usual {"start", "end", "text"} dict,
+so code written for lists of dicts works unchanged.
+"""
+import struct
+
+import numpy as np
+
+from subtitle_io import format_timestamp
+
+
+MAGIC = b"SEGSTOR1"
+# Segment count, text table size, UTF-8 bytes of the text table.
+HEADER = struct.Struct("<QQQ")
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _intern(texts):
+    """Returns (text_ids, text_table) with each distinct text stored once."""
+    table = {}
+    text_ids = np.fromiter(
+        (table.setdefault(text, len(table)) for text in texts), dtype=np.uint32, count=len(texts)
+    )
+    return text_ids, list(table)
+
+
+def format_timestamps(seconds, decimal=","):
+    """
+    Formats an array of seconds as HH:MM:SS,mmm strings (HH:MM:SS.mmm for
+    VTT), rounded to the millisecond like subtitle_io.format_timestamp.
+    """
+    seconds = np.asarray(seconds, dtype=np.float64)
+    total_ms = np.rint(seconds * 1000).astype(np.int64)
+    hours, rest = np.divmod(total_ms, 3_600_000)
+    minutes, rest = np.divmod(rest, 60_000)
+    secs, ms = np.divmod(rest, 1000)
+
+    chars = np.empty((len(total_ms), 12), dtype=np.uint8)
+    for column, value, divisor in (
+        (0, hours, 10), (1, hours, 1),
+        (3, minutes, 10), (4, minutes, 1),
+        (6, secs, 10), (7, secs, 1),
+        (9, ms, 100), (10, ms, 10), (11, ms, 1),
+    ):
+        chars[:, column] = value // divisor % 10 + ord("0")
+    chars[:, [2, 5]] = ord(":")
+    chars[:, 8] = ord(decimal)
+    formatted = chars.view("S12").ravel().astype("U12").tolist()
+
+    # Times outside the fixed-width layout (100 hours or more, negative) are formatted one by one.
+    for i in np.flatnonzero((hours > 99) | (total_ms < 0)).tolist():
+        formatted[i] = format_timestamp(float(seconds[i]), decimal)
+    return formatted
+
+
+class SegmentStore:
+    """
+    Segments as columns: starts and ends (float64 arrays), text_ids (uint32
+    indices into text_table, a list of unique strings).
+    """
+
+    def __init__(self, starts, ends, text_ids, text_table):
+        self.starts = starts
+        self.ends = ends
+        self.text_ids = text_ids
+        self.text_table = text_table
+
+    @classmethod
+    def build(cls, starts, ends, texts):
+        """Builds a store from columns, interning the texts."""
+        text_ids, text_table = _intern(texts)
+        return cls(np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64), text_ids, text_table)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Builds a store from {"start", "end", "text"} dicts."""
+        if isinstance(segments, cls):
+            return segments
+        return cls.build(
+            [segment["start"] for segment in segments],
+            [segment["end"] for segment in segments],
+            [segment["text"] for segment in segments],
+        )
+
+    # -----------------------------
+    # Access
+    # -----------------------------
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Views: the arrays and the text table are shared, not copied.
+            return SegmentStore(self.starts[index], self.ends[index], self.text_ids[index], self.text_table)
+        return {
+            "start": float(self.starts[index]),
+            "end": float(self.ends[index]),
+            "text": self.text_table[self.text_ids[index]],
+        }
+
+    def __iter__(self):
+        table = self.text_table
+        for start, end, text_id in zip(self.starts.tolist(), self.ends.tolist(), self.text_ids.tolist()):
+            yield {"start": start, "end": end, "text": table[text_id]}
+
+    def __repr__(self):
+        return f"SegmentStore({len(self)} segments, {len(self.text_table)} unique texts)"
+
+    def texts(self):
+        """Returns every segment's text, in order."""
+        table = self.text_table
+        return [table[text_id] for text_id in self.text_ids.tolist()]
+
+    def to_segments(self):
+        """Returns the segments as a list of dicts."""
+        return list(self)
+
+    def timestamps(self, decimal=","):
+        """Returns (start, end) timestamp strings for every segment, formatted in one pass."""
+        return format_timestamps(self.starts, decimal), format_timestamps(self.ends, decimal)
+
+    def rebuild(self, rows, end_rows, texts):
+        """
+        Returns a store with segment rows[k] starting, and end_rows[k]
+        ending, segment k, with new texts. When the rows are unchanged the
+        time columns are shared rather than copied.
+        """
+        identity = np.arange(len(self))
+
+        def column(values, selected):
+            selected = np.asarray(selected, dtype=np.intp)
+            if len(selected) == len(self) and np.array_equal(selected, identity):
+                return values
+            return values[selected]
+
+        text_ids, text_table = _intern(texts)
+        return SegmentStore(column(self.starts, rows), column(self.ends, end_rows), text_ids, text_table)
+
+    # -----------------------------
+    # Serialization
+    # -----------------------------
+    def to_bytes(self):
+        """
+        Serializes the store: a header, the start, end and text-id columns,
+        the text table's offsets, then the text table as UTF-8. Every
+        section starts on an 8-byte boundary.
+        """
+        encoded = [text.encode("utf-8") for text in self.text_table]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        blob = b"".join(encoded)
+        text_ids = np.ascontiguousarray(self.text_ids, dtype=np.uint32).tobytes()
+
+        return b"".join([
+            MAGIC,
+            HEADER.pack(len(self), len(encoded), len(blob)),
+            np.ascontiguousarray(self.starts, dtype="<f8").tobytes(),
+            np.ascontiguousarray(self.ends, dtype="<f8").tobytes(),
+            text_ids, b"\0" * _padding(len(text_ids)),
+            offsets.astype("<u8").tobytes(),
+            blob,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reads a store written by to_bytes. The time columns are views of data."""
+        data = memoryview(data)
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a segment store")
+        count, table_size, blob_size = HEADER.unpack_from(data, len(MAGIC))
+
+        position = len(MAGIC) + HEADER.size
+
+        def column(dtype, length):
+            nonlocal position
+            array = np.frombuffer(data, dtype=dtype, count=length, offset=position)
+            position += array.nbytes + _padding(array.nbytes)
+            return array
+
+        starts = column("<f8", count)
+        ends = column("<f8", count)
+        text_ids = column("<u4", count)
+        offsets = column("<u8", table_size + 1).tolist()
+        blob = bytes(data[position:position + blob_size])
+        if len(blob) != blob_size:
+            raise ValueError("Segment store is truncated")
+        text_table = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(table_size)]
+        return cls(starts, ends, text_ids, text_table)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def __reduce__(self):
+        # Pickles (stage cache, multiprocessing) as the compact binary layout.
+        return SegmentStore.from_bytes, (self.to_bytes(),)
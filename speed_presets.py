@@ -0,0 +1,62 @@
+# --- CONFIGURATION ---
+# Transcription speed presets, passed to faster-whisper's model.transcribe.
+#
+# vad_filter skips silence and music with the Silero VAD before decoding:
+#   threshold: speech probability above which audio counts as speech
+#   min_silence_duration_ms: silences shorter than this are kept
+#   speech_pad_ms: audio kept on each side of detected speech
+# temperature: a list means "retry at the next temperature when decoding
+#   fails the compression/log-prob checks"; a single value disables retries.
+SPEED_PRESETS = {
+    "fast": {
+        "beam_size": 1,
+        "best_of": 1,
+        "temperature": 0.0,
+        "condition_on_previous_text": False,
+        "vad_filter": True,
+        "vad_parameters": {"threshold": 0.5, "min_silence_duration_ms": 500, "speech_pad_ms": 200},
+    },
+    "balanced": {
+        "beam_size": 5,
+        "best_of": 3,
+        "temperature": [0.0, 0.4, 0.8],
+        "condition_on_previous_text": True,
+        "vad_filter": True,
+        "vad_parameters": {"threshold": 0.5, "min_silence_duration_ms": 1000, "speech_pad_ms": 400},
+    },
+    "accurate": {
+        # Matches the original behaviour: beam 5, full temperature fallback, no VAD.
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "condition_on_previous_text": True,
+        "vad_filter": False,
+    },
+}
+
+DEFAULT_PRESET = "accurate"
+# ---------------------
+
+
+def transcribe_options(preset=None, vad_threshold=None, min_silence_ms=None):
+    """
+    Returns the keyword arguments for model.transcribe for a speed preset.
+    vad_threshold and min_silence_ms override the preset's silence settings
+    and turn the VAD filter on.
+    """
+    preset = preset or DEFAULT_PRESET
+    if preset not in SPEED_PRESETS:
+        raise ValueError(
+            f"Unknown speed preset '{preset}'. Choose one of: {', '.join(SPEED_PRESETS)}"
+        )
+
+    options = dict(SPEED_PRESETS[preset])
+    if vad_threshold is not None or min_silence_ms is not None:
+        vad_parameters = dict(options.get("vad_parameters", {}))
+        if vad_threshold is not None:
+            vad_parameters["threshold"] = vad_threshold
+        if min_silence_ms is not None:
+            vad_parameters["min_silence_duration_ms"] = min_silence_ms
+        options["vad_filter"] = True
+        options["vad_parameters"] = vad_parameters
+    return options
@@ -0,0 +1,532 @@
+"""
+The pipeline steps shared by video_subtitles.py and
+video_subtitles_translator.py, and the stage graph that connects them.
+
+A job is extract -> (select model) -> transcribe -> translate -> write SRT
+-> burn, with one translate/write/burn branch per target language. When
+the source language is known up front, the translation model loads while
+Whisper is still transcribing. Transcripts, model choices and translations
+are cached (see pipeline.py), so re-running a job, or adding a language to
+it, only redoes the stages whose inputs changed.
+"""
+import os
+from pathlib import Path
+
+from faster_whisper import WhisperModel
+
+import subtitle_io
+from metrics import CACHE_LOOKUPS, MODEL_LOADS, track_stage
+from model_selection import probe_language, select_model_size
+from pipeline import StageCache, StageGraph
+from resources import SCHEDULER
+import segment_grouping
+from segment_grouping import apply_translations, plan_translation
+from segment_store import SegmentStore
+from speed_presets import transcribe_options
+from utils import run_ffmpeg_with_progress
+
+
+# --- CONFIGURATION ---
+AUDIO_SAMPLE_RATE = 16000
+
+# Resolution ladder for --renditions: output height and video bitrate.
+RENDITIONS = {
+    "1080p": {"height": 1080, "video_bitrate": "5M"},
+    "720p": {"height": 720, "video_bitrate": "2800k"},
+    "480p": {"height": 480, "video_bitrate": "1200k"},
+    "360p": {"height": 360, "video_bitrate": "700k"},
+}
+# ---------------------
+
+
+# Helper function for color conversion
+def hex_to_ass_color(hex_color):
+    """Convert web hex color (#RRGGBB) to ASS subtitle format (&HBBGGRR&)"""
+    hex_color = hex_color.lstrip('#')
+    r = hex_color[0:2]
+    g = hex_color[2:4]
+    b = hex_color[4:6]
+    return f"&H{b.upper()}{g.upper()}{r.upper()}&"
+
+
+# -----------------------------
+# Step 1: Extract audio
+# -----------------------------
+def extract_audio(video_path, audio_path):
+    with SCHEDULER.stage("extract") as grant, track_stage("extract") as run:
+        command = [
+            "ffmpeg", "-y",
+            "-threads", str(grant.threads),
+            "-i", video_path,
+            "-ac", "1",
+            "-ar", str(AUDIO_SAMPLE_RATE),
+            audio_path
+        ]
+        run.media_seconds = run_ffmpeg_with_progress(command, video_path, "Extracting audio")
+
+
+# -----------------------------
+# Step 2: Transcribe audio
+# -----------------------------
+def transcribe_audio(audio_path, model_size="medium", language=None, options=None):
+    """
+    Transcribes with faster-whisper (int8 on the CPU). options are the
+    model.transcribe arguments of a speed preset (see speed_presets.py).
+    Returns (segments, info), with the segments in a SegmentStore.
+    """
+    options = options or transcribe_options()
+    with SCHEDULER.stage("transcribe") as grant, track_stage("transcribe") as run:
+        model = WhisperModel(
+            model_size, device="cpu", compute_type="int8",
+            cpu_threads=grant.threads, num_workers=1
+        )
+        MODEL_LOADS.inc(kind="whisper", model=model_size)
+        segments_iterator, info = model.transcribe(audio_path, language=language, **options)
+
+        # Segments are decoded lazily, so this loop is where the work happens.
+        starts, ends, texts = [], [], []
+        for s in segments_iterator:
+            starts.append(s.start)
+            ends.append(s.end)
+            texts.append(s.text)
+        segments = SegmentStore.build(starts, ends, texts)
+        run.media_seconds = info.duration
+
+    print(f"Detected language '{info.language}' with probability {info.language_probability:.2f}")
+    return segments, info
+
+
+# -----------------------------
+# Step 3: Translate segments
+# -----------------------------
+def translate_segments(segments, src_lang, tgt_lang, backend=None, beam_size=None, regroup=True,
+                       workers=None, translator=None):
+    """
+    Translates subtitle segments using the best available
+    open-source model for each language.
+
+    The backend ("torch" or "ctranslate2"), beam size and number of worker
+    processes default to the per-pair settings in translators.TRANSLATION_SETTINGS.
+    A single-process translator that is already loaded can be passed instead.
+
+    Fragments are merged into sentence units (unless regroup is False) and
+    duplicate units are translated once; each translation is then split
+    back across the original segments' time spans.
+    """
+    plan = plan_translation(segments, regroup=regroup)
+    # Sentence units answered by an identical earlier unit count as hits.
+    CACHE_LOOKUPS.inc(len(plan.texts), cache="translation_dedup", result="miss")
+    CACHE_LOOKUPS.inc(len(plan.groups) - len(plan.texts), cache="translation_dedup", result="hit")
+
+    with SCHEDULER.stage("translate") as grant, track_stage("translate") as run:
+        if translator is None:
+            from translators import load_translator
+            translator = load_translator(
+                src_lang, tgt_lang, backend=backend, beam_size=beam_size, threads=grant.threads, workers=workers
+            )
+        else:
+            # Worker processes for a preloaded translator start here, with this stage's share of the cores.
+            from translators import get_translation_settings, start_workers
+            translator.set_threads(grant.threads)
+            workers = get_translation_settings(src_lang, tgt_lang, {"workers": workers})["workers"]
+            translator = start_workers(translator, workers, grant.threads)
+        # Torch can change its thread count mid-run when other stages start or finish.
+        grant.on_rebalance = translator.set_threads
+
+        # -----------------------------
+        # Batch translation
+        # -----------------------------
+        print(f"Translating {len(segments)} segments as {len(plan.texts)} unique "
+              f"sentence units to '{tgt_lang}'...")
+        try:
+            translated_texts = translator.translate(plan.texts)
+        finally:
+            translator.close()
+        if segments:
+            run.media_seconds = segments[-1]["end"] - segments[0]["start"]
+
+    # -----------------------------
+    # Rebuild segments
+    # -----------------------------
+    return apply_translations(segments, plan, translated_texts)
+
+
+# -----------------------------
+# Step 4: Write SRT file
+# -----------------------------
+def write_srt(segments, srt_path):
+    subtitle_io.write_srt(segments, srt_path)
+
+
+# -----------------------------
+# Step 5: Burn subtitles
+# -----------------------------
+def subtitles_filter(srt_filename, lang_code=None, style_config=None, default_style=True):
+    """
+    Builds the ffmpeg 'subtitles' filter for an SRT file name relative to ffmpeg's cwd.
+    Without a style_config, default_style picks a style by language; with
+    default_style False the SRT is rendered with libass's own defaults.
+    """
+    if not style_config and not default_style:
+        return f"subtitles=filename='{srt_filename}'"
+
+    # Use custom style config if provided, otherwise use defaults
+    if style_config:
+        font_name = style_config.get("font_name", "Arial")
+        font_size = style_config.get("font_size", 20)
+        primary_color = hex_to_ass_color(style_config.get("primary_color", "#FFFFFF"))
+        text_outline_color = hex_to_ass_color(style_config.get("outline_color", "#000000"))  # Text outline from outline_color field
+        background_color = hex_to_ass_color(style_config.get("back_color", "#000000"))  # Background from back_color field
+        outline_width = style_config.get("outline_width", 1)
+        shadow = style_config.get("shadow", 1)
+        border_style = style_config.get("border_style", 3)
+
+        # Apply font directory if using special fonts
+        font_path = "Amiri-Regular.ttf"
+        fonts_dir = Path(font_path).parent.as_posix()
+
+        if font_name == "Amiri":
+            vf_arg = (
+                f"subtitles=filename='{srt_filename}':"
+                f"charenc=UTF-8:"
+                f"fontsdir='{fonts_dir}':"
+                f"force_style='FontName={font_name},"
+                f"FontSize={font_size},"
+                f"PrimaryColour={primary_color},"
+                f"OutlineColour={text_outline_color},"
+                f"BackColour={background_color},"
+                f"Shadow={shadow},"
+                f"Outline={outline_width},"
+                f"BorderStyle={border_style}'"
+            )
+        else:
+            vf_arg = (
+                f"subtitles=filename='{srt_filename}':"
+                f"charenc=UTF-8:"
+                f"force_style='FontName={font_name},"
+                f"FontSize={font_size},"
+                f"PrimaryColour={primary_color},"
+                f"OutlineColour={text_outline_color},"
+                f"BackColour={background_color},"
+                f"Shadow={shadow},"
+                f"Outline={outline_width},"
+                f"BorderStyle={border_style}'"
+            )
+    else:
+        # Default styles based on language
+        font_path = "Amiri-Regular.ttf"
+        fonts_dir = Path(font_path).parent.as_posix()
+
+        if lang_code in ["ar", "fa"]:
+            vf_arg = (
+                f"subtitles=filename='{srt_filename}':"
+                f"charenc=UTF-8:"
+                f"fontsdir='{fonts_dir}':"
+                "force_style='FontName=Amiri,"
+                "FontSize=36,"
+                "PrimaryColour=&HFFFFFF&,"
+                "OutlineColour=&H000000&,"
+                "Shadow=1,"
+                "Outline=1,"
+                "BorderStyle=1'"
+            )
+        else:
+            vf_arg = (
+                f"subtitles=filename='{srt_filename}':"
+                f"charenc=UTF-8:"
+                "force_style='FontSize=20,"
+                "PrimaryColour=&HFFFFFF&,"
+                "OutlineColour=&H000000&,"
+                "Shadow=1,"
+                "Outline=1,"
+                "BorderStyle=3'"
+            )
+
+    return vf_arg
+
+
+def burn_subtitles(video_path, srt_path, output_path, lang_code=None, style_config=None, default_style=True):
+    video_path_obj = Path(video_path).resolve()
+    srt_path_obj = Path(srt_path).resolve()
+    output_path_obj = Path(output_path).resolve()
+    # ffmpeg runs from the SRT's directory so the subtitles filter only sees a
+    # plain file name (filter paths need escaping); the video and output are
+    # ordinary arguments and can be absolute.
+    cwd_dir = srt_path_obj.parent
+
+    vf_arg = subtitles_filter(srt_path_obj.name, lang_code, style_config, default_style)
+
+    with SCHEDULER.stage("burn") as grant, track_stage("burn") as run:
+        command = [
+            "ffmpeg", "-y",
+            "-filter_threads", str(grant.threads),
+            "-i", str(video_path_obj),
+            "-vf", vf_arg,
+            "-c:a", "copy",
+            "-threads", str(grant.threads),
+            str(output_path_obj),
+        ]
+
+        run.media_seconds = run_ffmpeg_with_progress(
+            command, str(video_path_obj), "Burning subtitles", cwd=cwd_dir
+        )
+
+
+def burn_subtitles_renditions(video_path, srt_path, output_base, renditions, lang_code=None, style_config=None,
+                              default_style=True):
+    """
+    Burns subtitles into several resolutions from one decode of the source.
+
+    The decoded video is split, each branch is scaled and then subtitled (so
+    text is rendered at the output's own resolution; libass scales SRT fonts
+    with the frame height) and fed to its own encoder. renditions are names
+    from RENDITIONS. Returns the output paths.
+    """
+    video_path_obj = Path(video_path).resolve()
+    srt_path_obj = Path(srt_path).resolve()
+    cwd_dir = srt_path_obj.parent
+    subtitle_filter = subtitles_filter(srt_path_obj.name, lang_code, style_config, default_style)
+
+    ladder = [(name, RENDITIONS[name]) for name in renditions]
+    split_labels = "".join(f"[s{i}]" for i in range(len(ladder)))
+    filter_graph = [f"[0:v]split={len(ladder)}{split_labels}"]
+    for i, (name, rendition) in enumerate(ladder):
+        # Never upscale: sources smaller than a rung keep their own height.
+        filter_graph.append(
+            f"[s{i}]scale=w=-2:h='min({rendition['height']},ih)',{subtitle_filter}[v{i}]"
+        )
+
+    with SCHEDULER.stage("burn") as grant, track_stage("burn") as run:
+        # The filter graph gets every thread; the encoders share them.
+        encoder_threads = max(1, grant.threads // len(ladder))
+        command = [
+            "ffmpeg", "-y",
+            "-filter_complex_threads", str(grant.threads),
+            "-i", str(video_path_obj),
+            "-filter_complex", ";".join(filter_graph),
+        ]
+
+        outputs = []
+        for i, (name, rendition) in enumerate(ladder):
+            output_path = Path(f"{output_base}_{name}.mp4").resolve()
+            bitrate = rendition["video_bitrate"]
+            command += [
+                "-map", f"[v{i}]", "-map", "0:a?",
+                "-c:v", "libx264", "-b:v", bitrate, "-maxrate", bitrate,
+                "-bufsize", rendition.get("buffer_size", bitrate),
+                "-c:a", "copy",
+                "-threads", str(encoder_threads),
+                str(output_path),
+            ]
+            outputs.append((name, str(output_path)))
+
+        run.media_seconds = run_ffmpeg_with_progress(
+            command, str(video_path_obj), "Burning renditions", cwd=cwd_dir, outputs=outputs
+        )
+
+    return [path for _, path in outputs]
+
+
+# -----------------------------
+# Stage graph
+# -----------------------------
+def build_job_graph(video_path, srt_path=None, target_languages=(None,), style_config=None,
+                    default_style=True, renditions=None, model_size="small", source_language=None,
+                    deadline=None, rtf_target=None, transcribe_settings=None, translation_settings=None,
+                    srt_name="{base}.{lang}.srt", output_name="{base}_subtitled_{lang}"):
+    """
+    Declares the stages of one job in the current directory. Returns
+    (graph, branches): one branch per target language, None meaning the
+    spoken language. Branch b produces the artifacts "srt_<b>" and
+    "videos_<b>" ("videos" alone when burning an existing srt_path).
+
+    srt_name and output_name are formatted with the video's base name and
+    the subtitle language. transcribe_settings are model.transcribe
+    arguments; translation_settings are keyword arguments for
+    translate_segments (backend, beam_size, workers).
+    """
+    video_path = Path(video_path).resolve()
+    base = video_path.stem
+    graph = StageGraph()
+    graph.file("video", video_path)
+
+    def burner(output_base):
+        def burn(video, srt, language):
+            output = output_base.format(base=base, lang=language)
+            if renditions:
+                return burn_subtitles_renditions(
+                    video, srt, output, renditions, language, style_config, default_style
+                )
+            burn_subtitles(video, srt, f"{output}.mp4", language, style_config, default_style)
+            return [f"{output}.mp4"]
+        return burn
+
+    if srt_path:
+        # Only the burn-in step.
+        graph.file("srt", srt_path)
+        graph.value("language", None)
+        graph.add("burn", burner(output_name), inputs=("video", "srt", "language"), outputs=("videos",))
+        return graph, []
+
+    # -----------------------------
+    # Audio and transcription
+    # -----------------------------
+    def extract(video, audio_path):
+        extract_audio(video, audio_path)
+        return audio_path
+
+    def select(audio, options, budget, language):
+        size, decision = select_model_size(audio, budget["deadline"], budget["rtf_target"], options)
+        return size, decision, language or probe_language(decision)
+
+    def transcribe(audio, size, language, options):
+        segments, info = transcribe_audio(audio, model_size=size, language=language, options=options)
+        return {
+            "segments": segments,
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "duration": info.duration,
+        }
+
+    graph.value("audio_path", f"{base}_audio.wav")
+    graph.value("transcribe_options", transcribe_settings or transcribe_options())
+    graph.add("extract", extract, inputs=("video", "audio_path"), outputs=("audio",))
+
+    if model_size == "auto":
+        graph.value("model_budget", {"deadline": deadline, "rtf_target": rtf_target})
+        graph.value("requested_language", source_language)
+        graph.add("select_model", select,
+                  inputs=("audio", "transcribe_options", "model_budget", "requested_language"),
+                  outputs=("model_size", "model_selection", "language_hint"), cache=True)
+    else:
+        graph.value("model_size", model_size)
+        graph.value("model_selection", None)
+        graph.value("language_hint", source_language)
+
+    graph.add("transcribe", transcribe,
+              inputs=("audio", "model_size", "language_hint", "transcribe_options"),
+              outputs=("transcript",), cache=True, version=2)
+
+    # A known source language lets the translation models load during transcription.
+    if source_language:
+        graph.value("source_language", source_language)
+    else:
+        graph.add("detect_language", lambda transcript: transcript["language"],
+                  inputs=("transcript",), outputs=("source_language",))
+
+    # -----------------------------
+    # One branch per language
+    # -----------------------------
+    def loader(tgt_lang):
+        def load(src_lang, settings):
+            if src_lang == tgt_lang:
+                return None
+            from translators import load_translator
+            # Worker processes are started by the translate stage, once its thread budget is known.
+            with SCHEDULER.stage("load") as grant:
+                return load_translator(
+                    src_lang, tgt_lang, backend=settings.get("backend"),
+                    beam_size=settings.get("beam_size"), threads=grant.threads, workers=1
+                )
+        return load
+
+    def translator(tgt_lang):
+        def translate(transcript, src_lang, settings, loaded):
+            if loaded is None:
+                print(f"Skipping translation: the audio is already in '{tgt_lang}'.")
+                return transcript["segments"]
+            return translate_segments(
+                transcript["segments"], src_lang, tgt_lang, regroup=settings.get("regroup", True),
+                workers=settings.get("workers"), translator=loaded
+            )
+        return translate
+
+    def writer(tgt_lang):
+        def write(transcript, segments=None):
+            language = tgt_lang or transcript["language"]
+            srt = srt_name.format(base=base, lang=language)
+            write_srt(transcript["segments"] if segments is None else segments, srt)
+            return srt, language
+        return write
+
+    branches = list(dict.fromkeys(target_languages or [None]))
+    for tgt_lang in branches:
+        branch = tgt_lang or "original"
+        inputs = ("transcript",)
+        if tgt_lang:
+            graph.value(f"translation_settings_{branch}", _translation_settings(tgt_lang, translation_settings))
+            graph.add(f"load_translator_{branch}", loader(tgt_lang),
+                      inputs=("source_language", f"translation_settings_{branch}"),
+                      outputs=(f"translator_{branch}",))
+            graph.add(f"translate_{branch}", translator(tgt_lang),
+                      inputs=("transcript", "source_language", f"translation_settings_{branch}",
+                              f"translator_{branch}"),
+                      outputs=(f"segments_{branch}",), cache=True, version=2)
+            inputs += (f"segments_{branch}",)
+
+        graph.add(f"write_srt_{branch}", writer(tgt_lang), inputs=inputs,
+                  outputs=(f"srt_{branch}", f"language_{branch}"))
+        graph.add(f"burn_{branch}", burner(output_name),
+                  inputs=("video", f"srt_{branch}", f"language_{branch}"),
+                  outputs=(f"videos_{branch}",))
+
+    return graph, [tgt_lang or "original" for tgt_lang in branches]
+
+
+def _translation_settings(tgt_lang, overrides):
+    """
+    The settings value of a translation branch: the command-line overrides
+    (read by the stages), plus the configured settings that may apply to
+    the pair and the regrouping limits. The translate stage's cache key is
+    built from this value, so changing any of them re-translates.
+    """
+    from translators import TRANSLATION_SETTINGS
+
+    return dict(
+        overrides or {},
+        target=tgt_lang,
+        # The source language is part of the key through the stage's source_language input.
+        configured={
+            "default": TRANSLATION_SETTINGS["default"],
+            "pairs": {pair: settings for pair, settings in TRANSLATION_SETTINGS["pairs"].items()
+                      if pair.endswith(f"-{tgt_lang}")},
+        },
+        grouping={
+            "max_unit_chars": segment_grouping.MAX_UNIT_CHARS,
+            "max_gap_seconds": segment_grouping.MAX_GAP_SECONDS,
+        },
+    )
+
+
+def run_job(video_path, srt_path=None, max_parallel=None, use_cache=True, **settings):
+    """
+    Builds and runs a job's stage graph (see build_job_graph for settings).
+    Returns a dict with the output "videos" and "subtitles", the
+    "model_selection" decision (or None) and the "stages" timeline.
+    """
+    SCHEDULER.start_job()
+    graph, branches = build_job_graph(video_path, srt_path, **settings)
+    if branches:
+        targets = [f"videos_{b}" for b in branches] + [f"srt_{b}" for b in branches] + ["model_selection"]
+    else:
+        targets = ["videos"]
+
+    cache = StageCache() if use_cache else None
+    artifacts = graph.run(targets, max_parallel=max_parallel, cache=cache)
+
+    if branches:
+        # The intermediate audio (absent when every stage that needs it was cached).
+        audio_path = artifacts["audio_path"]
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+        videos = [video for b in branches for video in artifacts[f"videos_{b}"]]
+        subtitles = [artifacts[f"srt_{b}"] for b in branches]
+    else:
+        videos, subtitles = artifacts["videos"], []
+
+    return {
+        "videos": videos,
+        "subtitles": subtitles,
+        "model_selection": artifacts.get("model_selection"),
+        "stages": graph.timeline,
+    }
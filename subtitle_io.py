@@ -0,0 +1,216 @@
+"""
+Reading and writing SRT, WebVTT and ASS subtitle files.
+
+Files are read whole and parsed with one regular-expression pass, and
+written with a single join, so files with thousands of cues load and save
+quickly. Cues are the same {"start", "end", "text"} dicts (times in
+seconds) the pipeline uses for Whisper segments.
+"""
+import re
+from pathlib import Path
+
+
+# One SRT/VTT cue: a timing line (hours optional, ',' or '.' before the
+# milliseconds, cue settings allowed after the end time), then every line
+# up to the next blank (or whitespace-only) line. Text also stops before
+# the next cue's number and timing line, for files without blank lines
+# between cues.
+NEXT_CUE = r"[ \t]*(?:\d+[ \t]*\n[ \t]*)?(?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3}[ \t]*-->"
+CUE = re.compile(
+    r"^(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})[ \t]*-->[ \t]*"
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})[^\n]*\n"
+    rf"((?:(?!{NEXT_CUE})[ \t]*\S[^\n]*(?:\n|\Z))*)",
+    re.M
+)
+ASS_TIME = re.compile(r"(\d+):(\d{2}):(\d{2})[.:](\d{1,3})")
+ASS_OVERRIDE = re.compile(r"\{[^}]*\}")
+ASS_LEADING_OVERRIDES = re.compile(r"\s*((?:\{[^}]*\})*)")
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 384
+PlayResY: 288
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,16,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,1,1,2,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+FORMATS = (".srt", ".vtt", ".ass", ".ssa")
+
+
+def _to_seconds(hours, minutes, seconds, fraction):
+    # "5" as a fraction means 500 ms, as in "00:01.5"
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction.ljust(3, "0")) / 1000
+
+
+def format_timestamp(seconds, decimal=","):
+    """Seconds → HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm (VTT), rounded to the millisecond."""
+    total_ms = int(round(seconds * 1000))
+    hours, rest = divmod(total_ms, 3_600_000)
+    minutes, rest = divmod(rest, 60_000)
+    secs, ms = divmod(rest, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02}{decimal}{ms:03}"
+
+
+def _format_ass_timestamp(seconds):
+    total_cs = int(round(seconds * 100))
+    hours, rest = divmod(total_cs, 360_000)
+    minutes, rest = divmod(rest, 6000)
+    secs, cs = divmod(rest, 100)
+    return f"{hours}:{minutes:02}:{secs:02}.{cs:02}"
+
+
+# -----------------------------
+# Parsing
+# -----------------------------
+def parse_srt(content):
+    """Parses SRT (or WebVTT) text into cues. Cue numbers and VTT headers/notes are ignored."""
+    content = content.replace("\r\n", "\n").replace("\r", "\n").lstrip("\ufeff")
+    return [
+        {
+            "start": _to_seconds(*match.group(1, 2, 3, 4)),
+            "end": _to_seconds(*match.group(5, 6, 7, 8)),
+            "text": match.group(9).strip(),
+        }
+        for match in CUE.finditer(content)
+    ]
+
+
+parse_vtt = parse_srt
+
+
+def _ass_events(lines):
+    """Yields (line index, field names, raw values) for each Dialogue line of the [Events] section."""
+    fields = None
+    in_events = False
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if line.startswith("["):
+            in_events = line.lower() == "[events]"
+            continue
+        if not in_events:
+            continue
+        if line.startswith("Format:"):
+            fields = [field.strip().lower() for field in line[len("Format:"):].split(",")]
+        elif line.startswith("Dialogue:") and fields:
+            # Text is the last field and may itself contain commas.
+            yield index, fields, line[len("Dialogue:"):].split(",", len(fields) - 1)
+
+
+def parse_ass(content):
+    """Parses the Dialogue lines of an ASS/SSA file. Override tags like {\\i1} are removed."""
+    cues = []
+    for _, fields, values in _ass_events(content.lstrip("\ufeff").splitlines()):
+        event = dict(zip(fields, (value.strip() for value in values)))
+        text = ASS_OVERRIDE.sub("", event.get("text", ""))
+        cues.append({
+            "start": _to_seconds(*ASS_TIME.match(event["start"]).groups()),
+            "end": _to_seconds(*ASS_TIME.match(event["end"]).groups()),
+            "text": text.replace("\\N", "\n").replace("\\n", "\n").strip(),
+        })
+    return cues
+
+
+def read_subtitles(path):
+    """Reads an SRT, VTT or ASS/SSA file, chosen by extension."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Unsupported subtitle format '{suffix}'. Supported: {', '.join(FORMATS)}")
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        content = f.read()
+    if suffix in (".ass", ".ssa"):
+        return parse_ass(content)
+    return parse_srt(content)
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+def _columns(cues, decimal):
+    """Returns the cues' start and end timestamps and texts as three lists."""
+    if hasattr(cues, "timestamps"):
+        # A SegmentStore formats every timestamp in one vectorized pass.
+        starts, ends = cues.timestamps(decimal)
+        return starts, ends, cues.texts()
+    return (
+        [format_timestamp(cue["start"], decimal) for cue in cues],
+        [format_timestamp(cue["end"], decimal) for cue in cues],
+        [cue["text"] for cue in cues],
+    )
+
+
+def format_srt(cues):
+    starts, ends, texts = _columns(cues, ",")
+    return "".join(
+        f"{i}\n{start} --> {end}\n{text.strip()}\n\n"
+        for i, (start, end, text) in enumerate(zip(starts, ends, texts), 1)
+    )
+
+
+def format_vtt(cues):
+    starts, ends, texts = _columns(cues, ".")
+    return "WEBVTT\n\n" + "".join(
+        f"{start} --> {end}\n{text.strip()}\n\n"
+        for start, end, text in zip(starts, ends, texts)
+    )
+
+
+def format_ass(cues):
+    return ASS_HEADER + "".join(
+        f"Dialogue: 0,{_format_ass_timestamp(cue['start'])},{_format_ass_timestamp(cue['end'])},"
+        f"Default,,0,0,0,,{_ass_text(cue['text'])}\n"
+        for cue in cues
+    )
+
+
+def _ass_text(text):
+    return text.strip().replace("\n", "\\N")
+
+
+def replace_ass_text(content, texts):
+    """
+    Returns an ASS/SSA file with the text of each Dialogue line replaced by
+    texts (one per cue, in parse_ass order). The script info, styles and
+    every other event field are kept, as is an override block at the start
+    of a line (e.g. {\\an8}); tags inside the old text are dropped.
+    """
+    lines = content.splitlines(keepends=True)
+    events = list(_ass_events(lines))
+    if len(events) != len(texts):
+        raise ValueError(f"Expected {len(events)} texts for the Dialogue lines, got {len(texts)}")
+
+    for (index, _, values), text in zip(events, texts):
+        line = lines[index]
+        ending = line[len(line.rstrip("\r\n")):]
+        overrides = ASS_LEADING_OVERRIDES.match(values[-1]).group(1)
+        values[-1] = overrides + _ass_text(text)
+        lines[index] = "Dialogue:" + ",".join(values) + ending
+    return "".join(lines)
+
+
+def write_subtitles(cues, path):
+    """Writes cues as SRT, VTT or ASS, chosen by the file's extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".srt":
+        content = format_srt(cues)
+    elif suffix == ".vtt":
+        content = format_vtt(cues)
+    elif suffix in (".ass", ".ssa"):
+        content = format_ass(cues)
+    else:
+        raise ValueError(f"Unsupported subtitle format '{suffix}'. Supported: {', '.join(FORMATS)}")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def write_srt(cues, srt_path):
+    with open(srt_path, "w", encoding="utf-8") as f:
+        f.write(format_srt(cues))
@@ -20,7 +20,8 @@ class SubtitleConfigUI:
             "back_color": "#000000",     # Black
             "outline_width": 2,
             "shadow": 1,
-            "border_style": 3
+            "border_style": 3,
+            "speed_preset": "accurate"
         }
         
         self.setup_ui()
@@ -49,6 +50,18 @@ class SubtitleConfigUI:
         lang_combo.grid(row=1, column=1, sticky=tk.W, pady=5)
         lang_combo.bind("<<ComboboxSelected>>", lambda e: self.update_config("target_language", self.languages[self.lang_var.get()]))
         
+        # Transcription speed preset
+        ttk.Label(main_frame, text="Speed:", font=("Arial", 10, "bold")).grid(row=1, column=2, sticky=tk.E, pady=5)
+        self.speed_presets = {
+            "Fast (skip silence)": "fast",
+            "Balanced": "balanced",
+            "Accurate": "accurate"
+        }
+        self.speed_var = tk.StringVar(value="Accurate")
+        speed_combo = ttk.Combobox(main_frame, textvariable=self.speed_var, values=list(self.speed_presets.keys()), state="readonly", width=18)
+        speed_combo.grid(row=1, column=3, sticky=tk.W, pady=5)
+        speed_combo.bind("<<ComboboxSelected>>", lambda e: self.update_config("speed_preset", self.speed_presets[self.speed_var.get()]))
+        
         # Font settings
         ttk.Separator(main_frame, orient='horizontal').grid(row=2, column=0, columnspan=4, sticky='ew', pady=10)
         ttk.Label(main_frame, text="Font Settings", font=("Arial", 12, "bold")).grid(row=3, column=0, columnspan=4, sticky=tk.W)
@@ -264,6 +277,12 @@ class SubtitleConfigUI:
                     self.lang_var.set(name)
                     break
             
+            # Find speed preset name
+            for name, preset in self.speed_presets.items():
+                if preset == self.config.get("speed_preset", "accurate"):
+                    self.speed_var.set(name)
+                    break
+            
             # Update color buttons
             self.primary_color_btn.config(bg=self.config["primary_color"])
             self.outline_color_btn.config(bg=self.config["outline_color"])
@@ -0,0 +1,79 @@
+import pytest
+
+from pipeline import StageCache, StageGraph
+
+
+def build_graph(calls, number=2):
+    def record(name, func):
+        def run(*args):
+            calls.append(name)
+            return func(*args)
+        return run
+
+    graph = StageGraph()
+    graph.value("number", number)
+    graph.add("double", record("double", lambda n: n * 2), inputs=("number",), outputs=("doubled",))
+    graph.add("square", record("square", lambda n: n * n), inputs=("doubled",), outputs=("squared",), cache=True)
+    graph.add("describe", record("describe", lambda n: f"{n}!"), inputs=("squared",), outputs=("text",))
+    return graph
+
+
+def test_run_only_needed_stages():
+    calls = []
+    artifacts = build_graph(calls).run(["squared"], max_parallel=2)
+    assert artifacts["squared"] == 16
+    assert sorted(calls) == ["double", "square"]
+
+
+def test_cache_hit_skips_upstream_stages(tmp_path):
+    cache = StageCache(tmp_path)
+    calls = []
+    assert build_graph(calls).run(["text"], cache=cache)["text"] == "16!"
+    assert calls == ["double", "square", "describe"]
+
+    calls.clear()
+    graph = build_graph(calls)
+    assert graph.run(["text"], cache=cache)["text"] == "16!"
+    # "square" came from the cache, so "double" (its only input) was never needed.
+    assert calls == ["describe"]
+    assert [(entry["stage"], entry["cached"]) for entry in graph.timeline] == [("square", True), ("describe", False)]
+
+
+def test_cache_key_follows_input_values(tmp_path):
+    cache = StageCache(tmp_path)
+    build_graph([]).run(["squared"], cache=cache)
+
+    calls = []
+    assert build_graph(calls, number=3).run(["squared"], cache=cache)["squared"] == 36
+    assert calls == ["double", "square"]
+
+
+def test_failure_propagates_and_stops_downstream():
+    calls = []
+    graph = build_graph(calls)
+
+    def fail(n):
+        raise RuntimeError("boom")
+
+    graph.stages["square"].func = fail
+    with pytest.raises(RuntimeError, match="boom"):
+        graph.run(["text"])
+    assert "describe" not in calls
+
+
+def test_intermediate_artifacts_are_dropped():
+    artifacts = build_graph([]).run(["text"])
+    assert artifacts == {"number": 2, "text": "16!"}
+
+
+def test_missing_input_and_cycle_are_reported():
+    graph = StageGraph()
+    graph.add("a", lambda x: x, inputs=("missing",), outputs=("out",))
+    with pytest.raises(ValueError, match="nothing provides"):
+        graph.run(["out"])
+
+    graph = StageGraph()
+    graph.add("a", lambda x: x, inputs=("y",), outputs=("x",))
+    graph.add("b", lambda x: x, inputs=("x",), outputs=("y",))
+    with pytest.raises(ValueError, match="dependency cycle"):
+        graph.run(["x"])
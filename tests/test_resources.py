@@ -0,0 +1,36 @@
+from resources import ResourceScheduler, ThreadGrant
+
+
+def test_shares_split_by_weight():
+    grants = [ThreadGrant("transcribe", 4), ThreadGrant("translate", 3), ThreadGrant("extract", 1)]
+    assert ResourceScheduler._shares(grants, 8) == [4, 3, 1]
+    assert sum(ResourceScheduler._shares(grants, 7)) == 7
+
+
+def test_shares_at_least_one_thread_each():
+    grants = [ThreadGrant("transcribe", 4), ThreadGrant("burn", 3)]
+    assert ResourceScheduler._shares(grants, 1) == [1, 1]
+    assert ResourceScheduler._shares(grants, 0) == [1, 1]
+    assert ResourceScheduler._shares([], 8) == []
+
+
+def test_running_fixed_stage_keeps_its_threads():
+    scheduler = ResourceScheduler(total_cores=8)
+    with scheduler.stage("transcribe") as transcribe:
+        assert transcribe.threads == 8
+        with scheduler.stage("extract") as extract:
+            # Whisper cannot give threads back, so only what is left is shared.
+            assert transcribe.threads == 8
+            assert extract.threads == 1
+            assert scheduler.allocations[-1]["threads"] == {"transcribe": 8, "extract": 1}
+
+
+def test_rebalance_resizes_stages_with_a_callback():
+    scheduler = ResourceScheduler(total_cores=8)
+    resized = []
+    with scheduler.stage("translate", on_rebalance=resized.append) as translate:
+        assert translate.threads == 8
+        with scheduler.stage("burn") as burn:
+            assert (translate.threads, burn.threads) == (4, 4)
+        assert translate.threads == 8
+    assert resized == [4, 8]
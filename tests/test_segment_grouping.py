@@ -0,0 +1,60 @@
+from segment_grouping import apply_translations, plan_translation, split_text
+from segment_store import SegmentStore
+
+
+def test_split_text_proportional_at_spaces():
+    assert split_text("one two three four", [1, 1]) == ["one two", "three four"]
+
+
+def test_split_text_fewer_words_than_parts_keeps_words_whole():
+    assert split_text("Hi there", [1, 1, 1]) == ["Hi", "there", ""]
+    assert split_text("Okay.", [2, 1]) == ["Okay.", ""]
+
+
+def test_split_text_unspaced_script_splits_characters():
+    assert split_text("你好世界", [1, 1]) == ["你好", "世界"]
+    assert split_text("好", [1, 1]) == ["好", ""]
+
+
+def test_apply_translations_short_translation_extends_previous_cue():
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": "So"},
+        {"start": 1.0, "end": 2.0, "text": "yeah"},
+        {"start": 2.0, "end": 3.0, "text": "right."},
+    ]
+    plan = plan_translation(segments)
+    assert plan.texts == ["So yeah right."]
+
+    expected = [
+        {"start": 0.0, "end": 1.0, "text": "Alors"},
+        {"start": 1.0, "end": 3.0, "text": "ouais"},
+    ]
+    assert apply_translations(segments, plan, ["Alors ouais"]) == expected
+    store = SegmentStore.from_segments(segments)
+    assert apply_translations(store, plan, ["Alors ouais"]).to_segments() == expected
+
+
+def test_plan_translation_store_matches_dicts():
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": " Thank"},
+        {"start": 1.0, "end": 2.0, "text": " you."},
+        {"start": 2.0, "end": 3.0, "text": " [Music]"},
+        {"start": 6.0, "end": 7.0, "text": " Thank you"},
+        {"start": 7.0, "end": 8.0, "text": " [Music]"},
+    ]
+    expected = plan_translation(segments)
+    plan = plan_translation(SegmentStore.from_segments(segments))
+    assert plan.groups == expected.groups == [[0, 1], [2], [3], [4]]
+    assert plan.texts == expected.texts == ["Thank you.", "[Music]"]
+    assert plan.unit_to_text == expected.unit_to_text == [0, 1, 0, 1]
+
+
+def test_plan_translation_keeps_non_speech_apart_from_speech():
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": " [Music]"},
+        {"start": 5.0, "end": 6.0, "text": " Music."},
+        {"start": 9.0, "end": 10.0, "text": " [Music]"},
+    ]
+    plan = plan_translation(segments)
+    assert plan.texts == ["[Music]", "Music."]
+    assert plan.unit_to_text == [0, 1, 0]
@@ -0,0 +1,79 @@
+from subtitle_io import format_srt, parse_ass, parse_srt, replace_ass_text
+
+
+def test_parse_srt():
+    content = "1\n00:00:01,000 --> 00:00:02,500\nHello\nworld\n\n2\n00:00:03,000 --> 00:00:04,000\nBye\n"
+    assert parse_srt(content) == [
+        {"start": 1.0, "end": 2.5, "text": "Hello\nworld"},
+        {"start": 3.0, "end": 4.0, "text": "Bye"},
+    ]
+
+
+def test_parse_srt_crlf_and_bom():
+    content = "﻿1\r\n00:00:01,000 --> 00:00:02,000\r\nHello\r\n\r\n2\r\n00:00:03,000 --> 00:00:04,000\r\nBye\r\n"
+    assert parse_srt(content) == [
+        {"start": 1.0, "end": 2.0, "text": "Hello"},
+        {"start": 3.0, "end": 4.0, "text": "Bye"},
+    ]
+
+
+def test_parse_srt_whitespace_only_separator():
+    content = "1\n00:00:01,000 --> 00:00:02,000\nHello\n \n2\n00:00:03,000 --> 00:00:04,000\nBye\n\t\n"
+    assert parse_srt(content) == [
+        {"start": 1.0, "end": 2.0, "text": "Hello"},
+        {"start": 3.0, "end": 4.0, "text": "Bye"},
+    ]
+
+
+def test_parse_vtt_with_cue_settings():
+    content = (
+        "WEBVTT\n\nNOTE a comment\n\n"
+        "intro\n00:01.5 --> 00:02.000 align:start position:10%\n<i>Hello</i>\n\n"
+        "01:00:03.000 --> 01:00:04.000 line:0\nBye\n"
+    )
+    assert parse_srt(content) == [
+        {"start": 1.5, "end": 2.0, "text": "<i>Hello</i>"},
+        {"start": 3603.0, "end": 3604.0, "text": "Bye"},
+    ]
+
+
+def test_srt_round_trip():
+    cues = [{"start": 0.0, "end": 1.25, "text": "One"}, {"start": 1.5, "end": 3661.001, "text": "Two\nlines"}]
+    assert parse_srt(format_srt(cues)) == cues
+
+
+def test_parse_srt_without_blank_lines_between_cues():
+    content = (
+        "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nBye\n"
+        "00:00:05,000 --> 00:00:06,000\n3 things\n"
+    )
+    assert parse_srt(content) == [
+        {"start": 1.0, "end": 2.0, "text": "Hello"},
+        {"start": 3.0, "end": 4.0, "text": "Bye"},
+        {"start": 5.0, "end": 6.0, "text": "3 things"},
+    ]
+
+
+ASS_FILE = (
+    "[Script Info]\r\nTitle: Talk\r\nPlayResX: 1920\r\n\r\n"
+    "[V4+ Styles]\r\nFormat: Name, Fontname, Fontsize\r\nStyle: Sign,Verdana,40\r\n\r\n"
+    "[Events]\r\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\r\n"
+    "Comment: 0,0:00:00.00,0:00:01.00,Sign,,0,0,0,,note\r\n"
+    "Dialogue: 0,0:00:01.00,0:00:02.50,Sign,,10,20,30,,{\\an8\\pos(10,20)}Exit, {\\i1}left{\\i0}\r\n"
+    "Dialogue: 1,0:00:03.00,0:00:04.00,Default,Bob,0,0,0,,Two\\Nlines\r\n"
+)
+
+
+def test_parse_ass():
+    assert parse_ass(ASS_FILE) == [
+        {"start": 1.0, "end": 2.5, "text": "Exit, left"},
+        {"start": 3.0, "end": 4.0, "text": "Two\nlines"},
+    ]
+
+
+def test_replace_ass_text_keeps_header_and_fields():
+    result = replace_ass_text(ASS_FILE, ["Sortie, gauche", "Deux\nlignes"])
+    assert result == ASS_FILE.replace(
+        "{\\an8\\pos(10,20)}Exit, {\\i1}left{\\i0}", "{\\an8\\pos(10,20)}Sortie, gauche"
+    ).replace("Two\\Nlines", "Deux\\Nlignes")
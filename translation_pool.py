@@ -0,0 +1,115 @@
+"""
+Translates batches in several worker processes that share one loaded model.
+
+Torch generation on the CPU stops scaling after a few threads in one
+process, while loading a copy of the model per process multiplies memory.
+The pool loads the model once in the parent and then starts the workers:
+
+  * where fork is available (Linux) and the pool is started from the main
+    thread, the workers inherit the parent's memory, so the weights are
+    shared copy-on-write and never copied (they are only read during
+    generation);
+  * elsewhere (Windows, macOS, or from a pipeline stage running next to
+    other stages) the weights are moved to shared memory with
+    `share_memory()` and the spawned workers map the same tensors.
+
+Each worker runs torch with its share of the thread budget. Batches are
+handed out to whichever worker is free and the results come back in order.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+import threading
+
+import torch
+import torch.multiprocessing
+from tqdm import tqdm
+
+from resources import available_cores
+from translators import Translator
+
+
+# Set in the parent just before the workers are forked; each worker inherits it.
+_translator = None
+
+
+def _init_worker(translator, threads):
+    global _translator
+    if translator is not None:
+        # Spawned worker: unpickled with its tensors mapped from shared memory.
+        _translator = translator
+    torch.set_num_threads(threads)
+
+
+def _translate_batch(batch):
+    return _translator.translate_batch(batch)
+
+
+def fork_available():
+    # macOS lists fork, but system libraries there are not fork-safe.
+    return "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+
+
+class TranslationPool(Translator):
+    """
+    Wraps a loaded TorchTranslator and spreads its batches over `workers`
+    processes. `threads` (default: every core) is split evenly between them.
+    Create the pool before the parent translates anything itself, so the
+    workers do not inherit a running OpenMP thread pool.
+    """
+
+    backend = "torch"
+
+    def __init__(self, translator, workers, threads=None):
+        if translator.backend != "torch":
+            raise ValueError(f"Translation workers need the torch backend, not '{translator.backend}'")
+
+        super().__init__(translator.model_name, translator.tokenizer, translator.beam_size, translator.batch_size)
+        self.workers = workers
+        self.threads_per_worker = max(1, (threads or available_cores()) // workers)
+
+        # Fast tokenizers would otherwise warn about (and disable) their own threads after the fork.
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+        global _translator
+        # A fork from a stage thread copies the locks other stages' threads
+        # (Whisper, ffmpeg readers, other translators) may be holding, and
+        # the child can deadlock on them.
+        if fork_available() and threading.current_thread() is threading.main_thread():
+            _translator = translator
+            # Keep the garbage collector from writing to (and so copying) the inherited objects.
+            gc.freeze()
+            context = multiprocessing.get_context("fork")
+            initargs = (None, self.threads_per_worker)
+        else:
+            translator.model.share_memory()
+            context = torch.multiprocessing.get_context("spawn")
+            initargs = (translator, self.threads_per_worker)
+
+        self.start_method = context.get_start_method()
+        print(f"Starting {workers} translation workers ({self.start_method}, "
+              f"{self.threads_per_worker} threads each)")
+        try:
+            self._pool = context.Pool(workers, initializer=_init_worker, initargs=initargs)
+        finally:
+            if self.start_method == "fork":
+                gc.unfreeze()
+                # The workers have their copy; drop the parent's reference so
+                # the model can be freed once the caller lets go of it.
+                _translator = None
+
+    def translate(self, texts, desc="Translating"):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        translated = []
+        # imap yields the results in the order of the batches, whichever worker finishes first.
+        for result in tqdm(self._pool.imap(_translate_batch, batches), total=len(batches), desc=desc):
+            translated.extend(result)
+        return translated
+
+    def translate_batch(self, batch):
+        return self._pool.apply(_translate_batch, (batch,))
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
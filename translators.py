@@ -0,0 +1,263 @@
+import os
+import shutil
+from pathlib import Path
+from tqdm import tqdm
+
+from metrics import MODEL_LOADS, CACHE_LOOKUPS
+
+from transformers import MarianMTModel, MarianTokenizer, AutoTokenizer, AutoModelForSeq2SeqLM
+import torch
+
+
+# --- CONFIGURATION ---
+# Backend and beam settings per "src-tgt" language pair. Pairs that are not
+# listed use "default". A beam_size of None keeps the backend's own default
+# (the model's generation config for torch, 2 for CTranslate2). workers > 1
+# runs torch generation in that many processes sharing one copy of the model.
+TRANSLATION_SETTINGS = {
+    "default": {"backend": "torch", "beam_size": None, "batch_size": 8, "workers": 1},
+    "pairs": {
+        # "en-ar": {"backend": "ctranslate2", "beam_size": 4},
+    },
+}
+
+# Converted CTranslate2 models are cached here, one directory per model.
+CT2_CACHE_DIR = Path(os.environ.get(
+    "SUBTITLES_CT2_CACHE",
+    Path.home() / ".cache" / "subtitles" / "ctranslate2"
+))
+# ---------------------
+
+BACKENDS = ("torch", "ctranslate2")
+
+
+# -----------------------------
+# Model selection
+# -----------------------------
+def resolve_model_name(src_lang, tgt_lang):
+    """
+    Returns (model_name, is_marian) for the best available
+    open-source model for a language pair.
+    """
+    if tgt_lang == "ar":
+        # Best open-source English → Arabic MT
+        return "Helsinki-NLP/opus-mt-tc-big-en-ar", True
+    if tgt_lang == "fa":
+        # Best open-source English → Persian MT
+        return "SeyedAli/English-to-Persian-Translation-mT5-V1", False
+    if src_lang == "he" and tgt_lang == "en":
+        # Hebrew → English (note: direction is reversed in model name)
+        return "Helsinki-NLP/opus-mt-tc-big-he-en", True
+    # Default fallback
+    return f"Helsinki-NLP/opus-mt-{src_lang}-{tgt_lang}", True
+
+
+def get_translation_settings(src_lang, tgt_lang, overrides=None):
+    """Merges the default settings, the per-pair settings and any overrides."""
+    settings = dict(TRANSLATION_SETTINGS["default"])
+    settings.update(TRANSLATION_SETTINGS["pairs"].get(f"{src_lang}-{tgt_lang}", {}))
+    if overrides:
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+
+    if settings["backend"] not in BACKENDS:
+        raise ValueError(
+            f"Unknown translation backend '{settings['backend']}'. "
+            f"Choose one of: {', '.join(BACKENDS)}"
+        )
+    return settings
+
+
+# -----------------------------
+# Translators
+# -----------------------------
+class Translator:
+    """Translates lists of strings in batches. Subclasses implement translate_batch."""
+
+    backend = None
+
+    def __init__(self, model_name, tokenizer, beam_size=None, batch_size=8):
+        self.model_name = model_name
+        self.tokenizer = tokenizer
+        self.beam_size = beam_size
+        self.batch_size = batch_size
+
+    def set_threads(self, threads):
+        """Changes the number of CPU threads used for generation, where the backend allows it."""
+
+    def translate(self, texts, desc="Translating"):
+        translated = []
+        for i in tqdm(range(0, len(texts), self.batch_size), desc=desc):
+            translated.extend(self.translate_batch(texts[i:i + self.batch_size]))
+        return translated
+
+    def translate_batch(self, batch):
+        raise NotImplementedError
+
+    def close(self):
+        """Releases worker processes, if any."""
+
+
+class TorchTranslator(Translator):
+    """Full-precision PyTorch generation with a transformers model."""
+
+    backend = "torch"
+
+    def __init__(self, model_name, tokenizer, model, beam_size=None, batch_size=8, threads=None):
+        super().__init__(model_name, tokenizer, beam_size, batch_size)
+        self.model = model
+        self.model.eval()
+        if threads:
+            self.set_threads(threads)
+
+    def set_threads(self, threads):
+        torch.set_num_threads(threads)
+
+    def translate_batch(self, batch):
+        encoded = self.tokenizer(
+            batch,
+            return_tensors="pt",
+            padding=True,
+            truncation=True
+        )
+
+        generate_kwargs = {"max_length": 512}
+        if self.beam_size:
+            generate_kwargs["num_beams"] = self.beam_size
+
+        with torch.no_grad():
+            outputs = self.model.generate(**encoded, **generate_kwargs)
+
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+class CTranslate2Translator(Translator):
+    """int8 inference with a CTranslate2 conversion of a transformers model."""
+
+    backend = "ctranslate2"
+
+    def __init__(self, model_name, tokenizer, beam_size=None, batch_size=8, threads=None, cache_dir=None):
+        try:
+            import ctranslate2
+        except ImportError:
+            raise ImportError(
+                "The 'ctranslate2' backend needs the ctranslate2 package. "
+                "Install it with 'pip install ctranslate2'"
+            )
+
+        super().__init__(model_name, tokenizer, beam_size, batch_size)
+        self.model_dir = convert_to_ctranslate2(model_name, cache_dir)
+        self.threads = threads
+        # The thread count is fixed once the model is loaded, so the
+        # (quick) load of the converted model waits for the first batch.
+        self.translator = None
+
+    def set_threads(self, threads):
+        if self.translator is None:
+            self.threads = threads
+
+    def translate_batch(self, batch):
+        if self.translator is None:
+            import ctranslate2
+            self.translator = ctranslate2.Translator(
+                str(self.model_dir), device="cpu", compute_type="int8", intra_threads=self.threads or 0
+            )
+
+        source_tokens = [
+            self.tokenizer.convert_ids_to_tokens(
+                self.tokenizer.encode(text, truncation=True, max_length=512)
+            )
+            for text in batch
+        ]
+
+        translate_kwargs = {"max_decoding_length": 512}
+        if self.beam_size:
+            translate_kwargs["beam_size"] = self.beam_size
+
+        results = self.translator.translate_batch(source_tokens, **translate_kwargs)
+
+        return [
+            self.tokenizer.decode(
+                self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]),
+                skip_special_tokens=True
+            )
+            for result in results
+        ]
+
+
+def convert_to_ctranslate2(model_name, cache_dir=None):
+    """
+    Converts a transformers model to CTranslate2 with int8 weights, once.
+    Returns the directory of the cached conversion.
+    """
+    from ctranslate2.converters import TransformersConverter
+
+    cache_dir = Path(cache_dir or CT2_CACHE_DIR)
+    model_dir = cache_dir / f"{model_name.replace('/', '--')}-int8"
+    if (model_dir / "model.bin").exists():
+        CACHE_LOOKUPS.inc(cache="ctranslate2_models", result="hit")
+        return model_dir
+
+    CACHE_LOOKUPS.inc(cache="ctranslate2_models", result="miss")
+    print(f"Converting '{model_name}' to CTranslate2 (int8), this only happens once...")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = cache_dir / f"{model_dir.name}.tmp-{os.getpid()}"
+    try:
+        TransformersConverter(model_name).convert(str(tmp_dir), quantization="int8", force=True)
+        try:
+            os.replace(tmp_dir, model_dir)
+        except OSError:
+            # Another process finished the same conversion first.
+            if not (model_dir / "model.bin").exists():
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return model_dir
+
+
+def load_translator(src_lang, tgt_lang, backend=None, beam_size=None, batch_size=None, threads=None,
+                    workers=None):
+    """Loads the translator for a language pair using the configured backend."""
+    settings = get_translation_settings(src_lang, tgt_lang, {
+        "backend": backend, "beam_size": beam_size, "batch_size": batch_size, "workers": workers
+    })
+    model_name, is_marian = resolve_model_name(src_lang, tgt_lang)
+
+    print(f"Loading translation model: {model_name} (backend: {settings['backend']})")
+    MODEL_LOADS.inc(kind="translation", model=f"{model_name} ({settings['backend']})")
+
+    tokenizer_cls = MarianTokenizer if is_marian else AutoTokenizer
+    tokenizer = tokenizer_cls.from_pretrained(model_name)
+
+    if settings["backend"] == "ctranslate2":
+        translator = CTranslate2Translator(
+            model_name, tokenizer,
+            beam_size=settings["beam_size"],
+            batch_size=settings["batch_size"],
+            threads=threads
+        )
+        return start_workers(translator, settings["workers"], threads)
+
+    model_cls = MarianMTModel if is_marian else AutoModelForSeq2SeqLM
+    model = model_cls.from_pretrained(model_name)
+    translator = TorchTranslator(
+        model_name, tokenizer, model,
+        beam_size=settings["beam_size"],
+        batch_size=settings["batch_size"],
+        threads=threads
+    )
+    return start_workers(translator, settings["workers"], threads)
+
+
+def start_workers(translator, workers, threads=None):
+    """
+    Wraps a loaded translator in a TranslationPool of `workers` processes
+    sharing `threads` cores. Returns the translator itself for one worker.
+    """
+    if workers <= 1:
+        return translator
+    if translator.backend != "torch":
+        print("Note: translation workers only apply to the torch backend; CTranslate2 uses its own threads.")
+        return translator
+    from translation_pool import TranslationPool
+    return TranslationPool(translator, workers, threads=threads)
@@ -1,17 +1,17 @@
 import subprocess
 import re
+import os
+import json
 from tqdm import tqdm
+from subtitle_io import format_timestamp
+from metrics import FFMPEG_SPEED
 
 # -----------------------------
 # Utility: seconds → SRT time
 # -----------------------------
 def sec_to_srt(t):
     """Converts seconds to SRT time format (HH:MM:SS,ms)."""
-    h = int(t // 3600)
-    m = int((t % 3600) // 60)
-    s = int(t % 60)
-    ms = int((t - int(t)) * 1000)
-    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+    return format_timestamp(t)
 
 
 # ---------------------------------
@@ -33,23 +33,39 @@ def get_video_duration(video_path):
         print("Warning: Could not determine video duration.")
         return None
 
-def run_ffmpeg_with_progress(command, video_path, desc, cwd=None):
+def run_ffmpeg_with_progress(command, video_path, desc, cwd=None, outputs=None):
     """
     Runs an ffmpeg command with a tqdm progress bar.
     Captures and raises an error with detailed output if the command fails.
+
+    outputs, a list of (label, path), gives one bar per output file. All
+    outputs of one command are encoded from the same frames, so they share
+    ffmpeg's timeline; each bar also shows its file's current size.
+
+    Returns the input's duration in seconds (None if it is unknown).
     """
     total_duration = get_video_duration(video_path)
     if total_duration is None:
         # If we can't get the duration, run without a progress bar
         subprocess.run(command, check=True, cwd=cwd)
-        return
+        return None
 
     # Regex to find the time in ffmpeg's output
     time_regex = re.compile(r"time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})")
+    speed_regex = re.compile(r"speed=\s*([\d.]+)x")
+    speed = None
     
     output_lines = []
 
-    with tqdm(total=round(total_duration), desc=desc, unit='s', dynamic_ncols=True) as pbar:
+    if outputs:
+        bars = [
+            tqdm(total=round(total_duration), desc=f"{desc} [{label}]", unit='s', dynamic_ncols=True, position=i)
+            for i, (label, _) in enumerate(outputs)
+        ]
+    else:
+        bars = [tqdm(total=round(total_duration), desc=desc, unit='s', dynamic_ncols=True)]
+
+    try:
         # Use Popen to stream output
         process = subprocess.Popen(
             command,
@@ -63,6 +79,9 @@ def run_ffmpeg_with_progress(command, video_path, desc, cwd=None):
         last_seconds = 0
         for line in process.stdout:
             output_lines.append(line)
+            speed_match = speed_regex.search(line)
+            if speed_match:
+                speed = float(speed_match.group(1))
             match = time_regex.search(line)
             if match:
                 hours, minutes, seconds, _ = map(int, match.groups())
@@ -71,8 +90,14 @@ def run_ffmpeg_with_progress(command, video_path, desc, cwd=None):
                 # Update progress bar
                 update_amount = current_seconds - last_seconds
                 if update_amount > 0:
-                    pbar.update(update_amount)
+                    for i, pbar in enumerate(bars):
+                        pbar.update(update_amount)
+                        if outputs:
+                            pbar.set_postfix(size=_file_size(outputs[i][1]), refresh=False)
                     last_seconds = current_seconds
+    finally:
+        for pbar in bars:
+            pbar.close()
     
     process.wait()
     if process.returncode != 0:
@@ -82,3 +107,31 @@ def run_ffmpeg_with_progress(command, video_path, desc, cwd=None):
             command, 
             output=error_output
         )
+
+    if speed:
+        FFMPEG_SPEED.observe(speed, step=desc)
+    return total_duration
+
+
+def _file_size(path):
+    try:
+        return f"{os.path.getsize(path) / 1e6:.1f}MB"
+    except OSError:
+        return "0.0MB"
+
+
+def child_cpu_seconds():
+    """CPU seconds used so far by finished child processes (e.g. ffmpeg). Not available on Windows."""
+    if os.name == "nt":
+        return None
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+# ---------------------------------
+# Utility: Job report
+# ---------------------------------
+def write_job_report(report_path, report):
+    """Writes a JSON report describing how a job ran (resource use, decisions, outputs)."""
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
@@ -1,40 +1,36 @@
 import subprocess
 import sys
 import argparse
-from faster_whisper import WhisperModel
-from tqdm import tqdm
 import os
 import json
+import shutil
 from pathlib import Path
-from utils import sec_to_srt, get_video_duration, run_ffmpeg_with_progress
+import subtitle_io
+from utils import write_job_report
+from resources import SCHEDULER
+from metrics import start_exporters
+from model_selection import MODEL_SIZES
+from speed_presets import SPEED_PRESETS, DEFAULT_PRESET, transcribe_options
+from stages import RENDITIONS, run_job, translate_segments
+from segment_store import SegmentStore
+import work_queue
 
 # Import translation libraries
 try:
-    from transformers import MarianMTModel, MarianTokenizer, AutoTokenizer, AutoModelForSeq2SeqLM
-    import torch
+    from translators import BACKENDS
 except ImportError:
     print("Transformers library not found. Please install it with 'pip install transformers torch sentencepiece'")
     sys.exit(1)
 
 
 # --- CONFIGURATION ---
+# Audio sample rate and the --renditions ladder are set in stages.py.
 CONFIG = {
-    "model_size": "small",  # Using 'small' for a good balance of speed and accuracy
-    "audio_sample_rate": 16000,
+    "model_size": "small",  # Using 'small' for a good balance of speed and accuracy; "auto" picks from a probe
 }
 # ---------------------
 
 
-# Helper function for color conversion
-def hex_to_ass_color(hex_color):
-    """Convert web hex color (#RRGGBB) to ASS subtitle format (&HBBGGRR&)"""
-    hex_color = hex_color.lstrip('#')
-    r = hex_color[0:2]
-    g = hex_color[2:4]
-    b = hex_color[4:6]
-    return f"&H{b.upper()}{g.upper()}{r.upper()}&"
-
-
 # ---------------------------------
 # Supported Languages for Translation
 # ---------------------------------
@@ -49,233 +45,16 @@ def get_supported_languages():
 
 
 # -----------------------------
-# Step 1: Extract audio
-# -----------------------------
-def extract_audio(video_path, audio_path):
-    command = [
-        "ffmpeg", "-y",
-        "-i", video_path,
-        "-ac", "1",
-        "-ar", str(CONFIG["audio_sample_rate"]),
-        audio_path
-    ]
-    run_ffmpeg_with_progress(command, video_path, "Extracting audio")
-
-
-# -----------------------------
-# Step 2: Transcribe audio
-# -----------------------------
-def transcribe_audio(audio_path, model_size="medium"):
-    model = WhisperModel(model_size, device="cpu", compute_type="int8")
-    segments_iterator, info = model.transcribe(audio_path, beam_size=5)
-    
-    segments_list = [
-        {"start": s.start, "end": s.end, "text": s.text}
-        for s in segments_iterator
-    ]
-    
-    print(f"Detected language '{info.language}' with probability {info.language_probability:.2f}")
-    return segments_list, info
-
-
-# -----------------------------
-# Step 3: Translate segments
+# Main pipeline
 # -----------------------------
-def translate_segments(segments, src_lang, tgt_lang):
+def main(video_path, srt_path_arg=None, target_language=None, style_config=None,
+         translation_backend=None, beam_size=None, model_size=None, deadline=None, rtf_target=None,
+         speed_preset=None, vad_threshold=None, min_silence_ms=None, renditions=None,
+         translation_workers=None, source_language=None, use_cache=True):
     """
-    Translates subtitle segments using the best available
-    open-source model for each language.
+    Runs the pipeline in the current directory. Returns the paths of the files it wrote.
+    target_language may be a list; each language gets its own SRT and video.
     """
-
-    # -----------------------------
-    # Model selection
-    # -----------------------------
-    if tgt_lang == "ar":
-        # Best open-source English → Arabic MT
-        model_name = "Helsinki-NLP/opus-mt-tc-big-en-ar"
-        tokenizer = MarianTokenizer.from_pretrained(model_name)
-        model = MarianMTModel.from_pretrained(model_name)
-
-    elif tgt_lang == "fa":
-        # Best open-source English → Persian MT
-        model_name = "SeyedAli/English-to-Persian-Translation-mT5-V1"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-
-    elif src_lang == "he" and tgt_lang == "en":
-        # Hebrew → English (note: direction is reversed in model name)
-        model_name = "Helsinki-NLP/opus-mt-tc-big-he-en"
-        tokenizer = MarianTokenizer.from_pretrained(model_name)
-        model = MarianMTModel.from_pretrained(model_name)
-
-    else:
-        # Default fallback (existing behavior)
-        model_name = f"Helsinki-NLP/opus-mt-{src_lang}-{tgt_lang}"
-        tokenizer = MarianTokenizer.from_pretrained(model_name)
-        model = MarianMTModel.from_pretrained(model_name)
-
-    print(f"Loading translation model: {model_name}")
-
-    # -----------------------------
-    # Batch translation
-    # -----------------------------
-    original_texts = [seg["text"] for seg in segments]
-    translated_texts = []
-    batch_size = 8
-
-    print(f"Translating {len(original_texts)} segments to '{tgt_lang}'...")
-
-    for i in tqdm(range(0, len(original_texts), batch_size), desc="Translating"):
-        batch = original_texts[i:i + batch_size]
-
-        encoded = tokenizer(
-            batch,
-            return_tensors="pt",
-            padding=True,
-            truncation=True
-        )
-
-        with torch.no_grad():
-            outputs = model.generate(**encoded, max_length=512)
-
-        translated_texts.extend(
-            tokenizer.batch_decode(outputs, skip_special_tokens=True)
-        )
-
-    # -----------------------------
-    # Rebuild segments
-    # -----------------------------
-    translated_segments = []
-    for i, seg in enumerate(segments):
-        translated_segments.append({
-            "start": seg["start"],
-            "end": seg["end"],
-            "text": translated_texts[i]
-        })
-
-    return translated_segments
-
-
-
-# -----------------------------
-# Step 4: Write SRT file
-# -----------------------------
-def write_srt(segments, srt_path):
-    with open(srt_path, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(segments, 1):
-            start = sec_to_srt(seg["start"])
-            end = sec_to_srt(seg["end"])
-            text = seg["text"].strip()
-
-            f.write(f"{i}\n")
-            f.write(f"{start} --> {end}\n")
-            f.write(text + "\n\n")
-
-
-# -----------------------------
-# Step 5: Burn subtitles
-# -----------------------------
-def burn_subtitles(video_path, srt_path, output_path, lang_code=None, style_config=None):
-    video_path_obj = Path(video_path).resolve()
-    srt_path_obj = Path(srt_path).resolve()
-    output_path_obj = Path(output_path).resolve()
-    cwd_dir = video_path_obj.parent
-    
-    video_filename_relative = video_path_obj.name
-    srt_filename_relative = srt_path_obj.relative_to(cwd_dir).as_posix()
-    output_filename_relative = output_path_obj.name
-
-    # Base subtitle filter
-    
-    # Use custom style config if provided, otherwise use defaults
-    if style_config:
-        font_name = style_config.get("font_name", "Arial")
-        font_size = style_config.get("font_size", 20)
-        primary_color = hex_to_ass_color(style_config.get("primary_color", "#FFFFFF"))
-        text_outline_color = hex_to_ass_color(style_config.get("outline_color", "#000000"))  # Text outline from outline_color field
-        background_color = hex_to_ass_color(style_config.get("back_color", "#000000"))  # Background from back_color field
-        outline_width = style_config.get("outline_width", 1)
-        shadow = style_config.get("shadow", 1)
-        border_style = style_config.get("border_style", 3)
-        
-        # Apply font directory if using special fonts
-        font_path = "Amiri-Regular.ttf"
-        fonts_dir = Path(font_path).parent.as_posix()
-        
-        if font_name == "Amiri":
-            vf_arg = (
-                f"subtitles=filename='{srt_filename_relative}':"
-                f"charenc=UTF-8:"
-                f"fontsdir='{fonts_dir}':"
-                f"force_style='FontName={font_name},"
-                f"FontSize={font_size},"
-                f"PrimaryColour={primary_color},"
-                f"OutlineColour={text_outline_color},"
-                f"BackColour={background_color},"
-                f"Shadow={shadow},"
-                f"Outline={outline_width},"
-                f"BorderStyle={border_style}'"
-            )
-        else:
-            vf_arg = (
-                f"subtitles=filename='{srt_filename_relative}':"
-                f"charenc=UTF-8:"
-                f"force_style='FontName={font_name},"
-                f"FontSize={font_size},"
-                f"PrimaryColour={primary_color},"
-                f"OutlineColour={text_outline_color},"
-                f"BackColour={background_color},"
-                f"Shadow={shadow},"
-                f"Outline={outline_width},"
-                f"BorderStyle={border_style}'"
-            )
-    else:
-        # Default styles based on language
-        font_path = "Amiri-Regular.ttf"
-        fonts_dir = Path(font_path).parent.as_posix()
-
-        if lang_code in ["ar", "fa"]:
-            vf_arg = (
-                f"subtitles=filename='{srt_filename_relative}':"
-                f"charenc=UTF-8:"
-                f"fontsdir='{fonts_dir}':"
-                "force_style='FontName=Amiri,"
-                "FontSize=36,"
-                "PrimaryColour=&HFFFFFF&,"
-                "OutlineColour=&H000000&,"
-                "Shadow=1,"
-                "Outline=1,"
-                "BorderStyle=1'"
-            )
-        else:
-            vf_arg = (
-                f"subtitles=filename='{srt_filename_relative}':"
-                f"charenc=UTF-8:"
-                "force_style='FontSize=20,"
-                "PrimaryColour=&HFFFFFF&,"
-                "OutlineColour=&H000000&,"
-                "Shadow=1,"
-                "Outline=1,"
-                "BorderStyle=3'"
-            )
-
-    # ----------------------------------
-
-    command = [
-        "ffmpeg", "-y",
-        "-i", video_filename_relative,
-        "-vf", vf_arg,
-        "-c:a", "copy",
-        output_filename_relative,
-    ]
-    
-    run_ffmpeg_with_progress(command, str(video_path_obj), "Burning subtitles", cwd=cwd_dir)
-
-
-# -----------------------------
-# Main pipeline
-# -----------------------------
-def main(video_path, srt_path_arg=None, target_language=None, style_config=None):
     video_path_obj = Path(video_path).resolve()
 
     if not video_path_obj.exists():
@@ -283,6 +62,7 @@ def main(video_path, srt_path_arg=None, target_language=None, style_config=None)
         sys.exit(1)
 
     base = video_path_obj.stem
+    report = {"video": str(video_path_obj)}
     
     if srt_path_arg:
         # A specific SRT file was provided, so only run the burn-in step.
@@ -291,46 +71,125 @@ def main(video_path, srt_path_arg=None, target_language=None, style_config=None)
         if not srt_path.exists():
             print(f"Error: Provided SRT file not found at {srt_path_arg}")
             sys.exit(1)
-        
-        output_path = f"{base}_subtitled.mp4"
-        burn_subtitles(str(video_path_obj), str(srt_path), output_path, style_config=style_config)
+
+        result = run_job(
+            video_path_obj, srt_path, style_config=style_config, renditions=renditions,
+            output_name="{base}_subtitled", use_cache=use_cache
+        )
+        outputs = list(result["videos"])
 
     else:
         # No SRT file provided, run the full pipeline.
-        audio_path = f"{base}_audio.wav"
-        
-        print("Step 1: Extracting audio...")
-        extract_audio(str(video_path_obj), audio_path)
-
-        print("\\nStep 2: Transcribing audio...")
-        segments, info = transcribe_audio(audio_path, model_size=CONFIG["model_size"])
+        options = transcribe_options(speed_preset, vad_threshold, min_silence_ms)
+        report["transcription"] = {"preset": speed_preset or DEFAULT_PRESET, "options": options}
+        if target_language is None or isinstance(target_language, str):
+            target_language = [target_language]
+
+        print(f"Running the pipeline ({speed_preset or DEFAULT_PRESET} preset) for: "
+              f"{', '.join(language or 'original language' for language in target_language)}")
+        result = run_job(
+            video_path_obj, target_languages=target_language, style_config=style_config,
+            renditions=renditions, model_size=model_size or CONFIG["model_size"],
+            source_language=source_language, deadline=deadline, rtf_target=rtf_target,
+            transcribe_settings=options,
+            translation_settings={
+                "backend": translation_backend, "beam_size": beam_size, "workers": translation_workers
+            },
+            use_cache=use_cache
+        )
+        if result["model_selection"]:
+            report["model_selection"] = result["model_selection"]
+        outputs = result["videos"] + result["subtitles"]
+
+    videos = result["videos"]
+    report_path = f"{base}_job_report.json"
+    report["outputs"] = videos
+    report["stages"] = result["stages"]
+    report["resources"] = SCHEDULER.report()
+    write_job_report(report_path, report)
+    print("\n--- Done ---")
+    for video in videos:
+        print(f"Output video: {video}")
+    print(f"Job report: {report_path}")
+    return outputs + [report_path]
 
-        # Decide the final segments (translated or original)
-        final_segments = segments
-        srt_lang_code = info.language
 
-        if target_language and target_language != info.language:
-            print(f"\\nStep 3: Translating from '{info.language}' to '{target_language}'...")
-            final_segments = translate_segments(segments, src_lang=info.language, tgt_lang=target_language)
-            srt_lang_code = target_language
-        else:
-            print("\\nStep 3: Skipping translation.")
+# -----------------------------
+# Translate-only pipeline
+# -----------------------------
+def translate_subtitle_file(subtitle_path, tgt_lang, src_lang=None, output_path=None,
+                            translation_backend=None, beam_size=None, translation_workers=None):
+    """
+    Translates an existing SRT/VTT/ASS file, skipping audio extraction and
+    transcription. The source language comes from src_lang or from the file
+    name (e.g. 'talk.en.srt'). Returns the path of the translated file.
+    """
+    path = Path(subtitle_path)
+    if not path.exists():
+        print(f"Error: Subtitle file not found at {subtitle_path}")
+        sys.exit(1)
 
-        # Define SRT path based on language
-        srt_path = f"{base}.{srt_lang_code}.srt"
+    # "talk.en.srt" -> stem "talk", language "en"
+    stem = path.stem
+    name_lang = Path(stem).suffix[1:]
+    if name_lang in get_supported_languages():
+        stem = Path(stem).stem
+        src_lang = src_lang or name_lang
+    if not src_lang:
+        print("Error: Could not tell the subtitle language from the file name. Use --source-language.")
+        sys.exit(1)
 
-        print(f"\\nStep 4: Writing subtitles to '{srt_path}'...")
-        write_srt(final_segments, srt_path)
+    output_path = Path(output_path or path.with_name(f"{stem}.{tgt_lang}{path.suffix}"))
+    if src_lang == tgt_lang:
+        print(f"Skipping translation: '{path}' is already in '{tgt_lang}'.")
+        if output_path.resolve() != path.resolve():
+            shutil.copyfile(path, output_path)
+        return str(output_path)
+
+    # ASS to ASS keeps the original styles and event fields and only replaces each line's text.
+    ass_formats = (".ass", ".ssa")
+    keep_ass = path.suffix.lower() in ass_formats and output_path.suffix.lower() in ass_formats
+    if keep_ass:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            content = f.read()
+        cues = SegmentStore.from_segments(subtitle_io.parse_ass(content))
+    else:
+        cues = SegmentStore.from_segments(subtitle_io.read_subtitles(path))
+    print(f"Read {len(cues)} cues from '{path}' ({src_lang})")
+
+    print(f"Translating from '{src_lang}' to '{tgt_lang}'...")
+    translated = translate_segments(
+        cues, src_lang=src_lang, tgt_lang=tgt_lang,
+        backend=translation_backend, beam_size=beam_size, workers=translation_workers,
+        # Lines of an ASS file can differ in style and position, so each is translated on its own.
+        regroup=not keep_ass
+    )
 
-        print("\\nStep 5: Burning subtitles into video...")
-        output_path = f"{base}_subtitled_{srt_lang_code}.mp4"
-        burn_subtitles(str(video_path_obj), srt_path, output_path, srt_lang_code, style_config)
+    if keep_ass:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(subtitle_io.replace_ass_text(content, translated.texts()))
+    else:
+        subtitle_io.write_subtitles(translated, output_path)
+    print("\n--- Done ---")
+    print(f"Translated subtitles: {output_path}")
+    return str(output_path)
 
-        # Optional cleanup
-        os.remove(audio_path)
 
-    print("\\n--- Done ---")
-    print(f"Output video: {output_path}")
+# -----------------------------
+# Queue worker
+# -----------------------------
+def run_queue_job(job, video_path, work_dir):
+    """Runs one job from the shared work queue in work_dir; returns the files to publish."""
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        outputs = main(
+            str(video_path), target_language=job["target_language"],
+            style_config=job["style_config"], **job["options"]
+        )
+    finally:
+        os.chdir(previous_dir)
+    return [os.path.join(work_dir, path) for path in outputs]
 
 
 if __name__ == "__main__":
@@ -338,18 +197,119 @@ if __name__ == "__main__":
     lang_help = ", ".join([f"'{k}' ({v})" for k, v in supported_langs.items()])
 
     parser = argparse.ArgumentParser(description="Generate and translate subtitles for a video file.")
-    parser.add_argument("video_path", type=str, help="Path to the video file.")
+    parser.add_argument("video_path", type=str, nargs='?', default=None, help="Path to the video file.")
     parser.add_argument("srt_path", type=str, nargs='?', default=None, help="(Optional) Path to an existing SRT file to burn directly.")
     parser.add_argument(
-        "--target-language", "-t", type=str, default=None,
-        help=f"Optional: Language to translate the subtitles into. Supported codes: {list(supported_langs.keys())}"
+        "--target-language", "-t", type=str, nargs="+", default=None,
+        help=f"Optional: Language(s) to translate the subtitles into; several languages are translated and "
+             f"burned side by side. Supported codes: {list(supported_langs.keys())}"
     )
     parser.add_argument(
         "--config", "-c", type=str, default=None,
         help="Optional: Path to JSON configuration file for subtitle styling"
     )
+    parser.add_argument(
+        "--translate-only", type=str, default=None, metavar="SUBTITLE_FILE",
+        help="Optional: Translate an existing SRT/VTT/ASS file into --target-language without a video"
+    )
+    parser.add_argument(
+        "--source-language", "-s", type=str, default=None,
+        help="Optional: The spoken language (skips detection and loads the translation model during transcription), "
+             "or with --translate-only, the subtitle file's language if its name does not say (e.g. 'talk.en.srt')"
+    )
+    parser.add_argument(
+        "--output", "-o", type=str, default=None,
+        help="Optional: With --translate-only, where to write the translation (default: '<name>.<target>.<ext>')"
+    )
+    parser.add_argument(
+        "--metrics-file", type=str, default=None,
+        help="Optional: Keep a Prometheus text file of throughput metrics up to date (or set SUBTITLES_METRICS_FILE)"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=None,
+        help="Optional: Serve metrics at http://127.0.0.1:<port>/metrics (or set SUBTITLES_METRICS_PORT)"
+    )
+    parser.add_argument(
+        "--enqueue", type=str, default=None, metavar="QUEUE_DIR",
+        help="Optional: Add the video to a shared work queue instead of processing it here"
+    )
+    parser.add_argument(
+        "--worker", type=str, default=None, metavar="QUEUE_DIR",
+        help="Optional: Process jobs from a shared work queue until stopped (no video_path needed)"
+    )
+    parser.add_argument(
+        "--model-size", type=str, choices=MODEL_SIZES + ["auto"], default=None,
+        help=f"Optional: Whisper model size (default: '{CONFIG['model_size']}'). "
+             "'auto' probes this machine's speed and picks the largest size that meets --deadline or --rtf-target"
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=None,
+        help="Optional: With --model-size auto, seconds the transcription may take"
+    )
+    parser.add_argument(
+        "--rtf-target", type=float, default=None,
+        help="Optional: With --model-size auto, the highest acceptable real-time factor "
+             "(processing time / audio duration, default 1.0)"
+    )
+    parser.add_argument(
+        "--preset", type=str, choices=list(SPEED_PRESETS), default=None,
+        help=f"Optional: Transcription speed preset (default: '{DEFAULT_PRESET}'). "
+             "'fast' and 'balanced' skip silence with a VAD filter and use smaller beams"
+    )
+    parser.add_argument(
+        "--vad-threshold", type=float, default=None,
+        help="Optional: Speech probability threshold for the VAD filter (enables it)"
+    )
+    parser.add_argument(
+        "--vad-min-silence-ms", type=int, default=None,
+        help="Optional: Shortest silence, in ms, the VAD filter skips (enables it)"
+    )
+    parser.add_argument(
+        "--renditions", nargs="+", choices=list(RENDITIONS), default=None,
+        help="Optional: Write one subtitled video per resolution, decoding the source once"
+    )
+    parser.add_argument(
+        "--translation-backend", type=str, choices=BACKENDS, default=None,
+        help="Optional: Translation backend. 'ctranslate2' converts the model to int8 once and caches it. "
+             "Defaults to the per-language-pair setting in translators.py"
+    )
+    parser.add_argument(
+        "--beam-size", type=int, default=None,
+        help="Optional: Beam size for translation. Defaults to the per-language-pair setting"
+    )
+    parser.add_argument(
+        "--translation-workers", type=int, default=None,
+        help="Optional: Translate in this many processes sharing one copy of the model (torch backend). "
+             "Defaults to the per-language-pair setting"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Optional: Do not reuse or store cached transcripts and translations"
+    )
     
     args = parser.parse_args()
+    start_exporters(args.metrics_file, args.metrics_port)
+
+    if args.worker:
+        work_queue.run_worker(args.worker, run_queue_job)
+        sys.exit(0)
+    for language in args.target_language or []:
+        if language not in supported_langs:
+            parser.error(f"Unsupported target language '{language}'. Use one of: {lang_help}")
+    if args.translate_only:
+        if not args.target_language:
+            parser.error("--translate-only needs --target-language")
+        if args.output and len(args.target_language) > 1:
+            parser.error("--output can only be used with one target language")
+        for language in args.target_language:
+            translate_subtitle_file(
+                args.translate_only, language, args.source_language, args.output,
+                translation_backend=args.translation_backend, beam_size=args.beam_size,
+                translation_workers=args.translation_workers
+            )
+        sys.exit(0)
+    if not args.video_path:
+        parser.error("video_path is required unless --worker or --translate-only is given")
     
     # Load style config if provided
     style_config = None
@@ -362,14 +322,37 @@ if __name__ == "__main__":
             print(f"Warning: Could not load config file: {e}")
             print("Using default styles...")
 
-    if args.target_language and args.target_language not in supported_langs:
-        print(f"Error: Unsupported target language '{args.target_language}'.")
-        print("Please use one of the following language codes:")
-        print(lang_help)
-        sys.exit(1)
+    # Speed settings from the command line win over the config file (e.g. from the UI).
+    file_config = style_config or {}
+    speed_preset = args.preset or file_config.get("speed_preset")
+    vad_threshold = args.vad_threshold if args.vad_threshold is not None else file_config.get("vad_threshold")
+    min_silence_ms = (args.vad_min_silence_ms if args.vad_min_silence_ms is not None
+                      else file_config.get("vad_min_silence_ms"))
         
+    options = {
+        "translation_backend": args.translation_backend, "beam_size": args.beam_size,
+        "model_size": args.model_size, "deadline": args.deadline, "rtf_target": args.rtf_target,
+        "speed_preset": speed_preset, "vad_threshold": vad_threshold, "min_silence_ms": min_silence_ms,
+        "renditions": args.renditions, "translation_workers": args.translation_workers,
+        "source_language": args.source_language, "use_cache": not args.no_cache,
+    }
+    # One language is stored as a plain code, as before.
+    target_language = args.target_language
+    if target_language and len(target_language) == 1:
+        target_language = target_language[0]
+
+    if args.enqueue:
+        if args.srt_path:
+            print("Error: --enqueue does not support burning an existing SRT file.")
+            sys.exit(1)
+        job_id = work_queue.enqueue(
+            args.enqueue, args.video_path, target_language, style_config, options
+        )
+        print(f"Queued job {job_id} in {args.enqueue}")
+        sys.exit(0)
+
     try:
-        main(args.video_path, args.srt_path, args.target_language, style_config)
+        main(args.video_path, args.srt_path, target_language, style_config, **options)
     except subprocess.CalledProcessError as e:
         print("\n--- FFMPEG COMMAND FAILED ---")
         print(f"Command: {' '.join(e.cmd)}")
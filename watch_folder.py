@@ -0,0 +1,224 @@
+"""
+Watches input folders and queues finished videos for subtitling.
+
+A file is queued once its size and mtime have not changed for
+STABLE_SECONDS, so copies still in progress are left alone. Each folder
+may hold a `.subtitles.json` with its defaults: the same keys as the UI's
+style config, plus "target_languages" (a list, all handled by one job)
+and "options" (keyword arguments for video_subtitles_translator.main).
+Files are fingerprinted by content, so re-saving or re-copying a video
+that was already queued does not queue it again.
+
+Uses inotify when the optional inotify_simple package is installed
+(Linux), and polls the folders otherwise (and on network shares, where
+inotify does not see changes made by other machines).
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import work_queue
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+# --- CONFIGURATION ---
+STABLE_SECONDS = 10
+POLL_SECONDS = 2
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".avi", ".m4v", ".mxf"}
+FOLDER_CONFIG_NAME = ".subtitles.json"
+# Content fingerprints of everything already queued, kept in the queue directory.
+SEEN_FILE_NAME = "watch_seen.json"
+# Bytes hashed from each end of the file for the fingerprint.
+FINGERPRINT_BYTES = 4 * 1024 * 1024
+# ---------------------
+
+# Speed settings in the UI's config are arguments of main(), not style.
+SPEED_OPTIONS = {"speed_preset": "speed_preset", "vad_threshold": "vad_threshold",
+                 "vad_min_silence_ms": "min_silence_ms"}
+
+
+def is_candidate(path):
+    name = path.name
+    return (path.suffix.lower() in VIDEO_EXTENSIONS
+            and not name.startswith((".", "~"))
+            and path.is_file())
+
+
+def fingerprint(path):
+    """Hashes the size and the first and last few MB of a file; cheap even for large videos."""
+    size = path.stat().st_size
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > 2 * FINGERPRINT_BYTES:
+            f.seek(-FINGERPRINT_BYTES, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+def load_folder_config(folder):
+    """Returns (target_languages, style_config, options) for a watched folder."""
+    config_path = Path(folder) / FOLDER_CONFIG_NAME
+    if not config_path.exists():
+        return [None], None, {}
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    options = config.pop("options", {})
+    for key, option in SPEED_OPTIONS.items():
+        if key in config:
+            # An explicit entry in "options" wins.
+            options.setdefault(option, config.pop(key))
+    target_languages = config.pop("target_languages", None) or [config.get("target_language")]
+    return target_languages, config or None, options
+
+
+class FolderWatcher:
+    """Tracks candidate files until they are stable, then queues them once."""
+
+    def __init__(self, folders, queue_dir, stable_seconds=STABLE_SECONDS):
+        self.folders = [Path(folder).resolve() for folder in folders]
+        self.queue_dir = work_queue.init_queue(queue_dir)
+        self.stable_seconds = stable_seconds
+        self.seen_path = self.queue_dir / SEEN_FILE_NAME
+        self.seen = work_queue.read_json(self.seen_path) if self.seen_path.exists() else {}
+        # path -> (size, mtime, time the pair was first observed)
+        self.pending = {}
+        # path -> (size, mtime) of files already queued or skipped
+        self.handled = {}
+        # path -> last error reported for it, so a retried failure is logged once
+        self.errors = {}
+
+    def report_error(self, path, message):
+        if self.errors.get(path) != message:
+            self.errors[path] = message
+            print(message)
+
+    def scan(self):
+        """Adds every video in the watched folders as a candidate."""
+        for folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except OSError as e:
+                # E.g. a network share that dropped for a moment; try again on the next pass.
+                self.report_error(folder, f"Could not list {folder} ({e}); will retry")
+                continue
+            self.errors.pop(folder, None)
+            for entry in entries:
+                self.notice(Path(entry.path))
+
+    def notice(self, path):
+        try:
+            if not is_candidate(path):
+                return
+            stat = path.stat()
+        except OSError:
+            return
+        state = (stat.st_size, stat.st_mtime)
+        if self.handled.get(path) == state:
+            return
+        previous = self.pending.get(path)
+        if previous is None or previous[:2] != state:
+            self.pending[path] = state + (time.monotonic(),)
+
+    def check(self):
+        """Re-stats candidates and queues the ones that have been stable long enough."""
+        now = time.monotonic()
+        for path, (size, mtime, since) in list(self.pending.items()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                del self.pending[path]
+                self.errors.pop(path, None)
+                continue
+            except OSError as e:
+                self.report_error(path, f"Could not check {path.name} ({e}); will retry")
+                continue
+
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self.pending[path] = (stat.st_size, stat.st_mtime, now)
+            elif now - since >= self.stable_seconds and stat.st_size > 0:
+                if self.ingest(path):
+                    del self.pending[path]
+                    self.handled[path] = (size, mtime)
+
+    def ingest(self, path):
+        """Queues a stable file. Returns False if it could not be read, to try again later."""
+        try:
+            key = fingerprint(path)
+        except OSError as e:
+            # Moved, deleted or locked since it was checked.
+            self.report_error(path, f"Could not read {path.name} ({e}); will retry")
+            return False
+        if key in self.seen:
+            print(f"Skipping {path.name}: same content as {self.seen[key]['path']}, already queued")
+            return True
+
+        try:
+            target_languages, style_config, options = load_folder_config(path.parent)
+        except (OSError, ValueError) as e:
+            # Usually a .subtitles.json being edited; the file waits until it is fixed.
+            self.report_error(path, f"Could not load {path.parent / FOLDER_CONFIG_NAME} ({e}); "
+                                    f"{path.name} will be queued once it is fixed")
+            return False
+        self.errors.pop(path, None)
+        # One job for every language, so the video is transcribed once. One
+        # language is stored as a plain code, like jobs queued from the CLI.
+        target_language = target_languages[0] if len(target_languages) == 1 else target_languages
+        job_id = work_queue.enqueue(self.queue_dir, path, target_language, style_config, options)
+        self.seen[key] = {"path": str(path), "job_ids": [job_id], "time": time.time()}
+        work_queue.atomic_write_json(self.seen_path, self.seen)
+        languages = ", ".join(language or "original" for language in target_languages)
+        print(f"Queued {path.name} ({languages}): {job_id}")
+        return True
+
+
+def watch(folders, queue_dir, stable_seconds=STABLE_SECONDS, poll_seconds=POLL_SECONDS, use_inotify=True):
+    """Watches the folders until interrupted."""
+    watcher = FolderWatcher(folders, queue_dir, stable_seconds)
+
+    inotify = None
+    if use_inotify and INotify is not None:
+        inotify = INotify()
+        watch_flags = flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO
+        descriptors = {inotify.add_watch(str(folder), watch_flags): folder for folder in watcher.folders}
+        print(f"Watching {len(watcher.folders)} folder(s) with inotify")
+    else:
+        print(f"Watching {len(watcher.folders)} folder(s) by polling every {poll_seconds}s")
+
+    # Files already there when the watcher starts.
+    watcher.scan()
+    while True:
+        if inotify is not None:
+            # Events only point at files to look at; stability is still checked by polling.
+            for event in inotify.read(timeout=int(poll_seconds * 1000)):
+                if event.name:
+                    watcher.notice(descriptors[event.wd] / event.name)
+        else:
+            time.sleep(poll_seconds)
+            watcher.scan()
+        watcher.check()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue videos dropped into watched folders.")
+    parser.add_argument("queue_dir", type=str, help="Shared work queue directory (see work_queue.py).")
+    parser.add_argument("folders", nargs="+", help="Folders to watch.")
+    parser.add_argument("--stable-seconds", type=float, default=STABLE_SECONDS,
+                        help="Seconds a file's size and mtime must stay unchanged before it is queued.")
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS)
+    parser.add_argument("--poll", action="store_true",
+                        help="Poll even if inotify is available (needed on network shares).")
+    args = parser.parse_args()
+
+    try:
+        watch(args.folders, args.queue_dir, args.stable_seconds, args.poll_seconds, use_inotify=not args.poll)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,388 @@
+"""
+A work queue on a shared directory, so several machines can drain one backlog.
+
+Layout of a queue directory:
+
+    pending/<job_id>.json   jobs waiting for a worker
+    claimed/<job_id>.json   jobs being processed; the file's mtime is the heartbeat
+    done/<job_id>.json      finished jobs, with the list of outputs
+    failed/<job_id>.json    jobs that failed MAX_ATTEMPTS times
+    outputs/<job_id>/       files produced by each job
+
+A worker claims a job by renaming it from pending/ to claimed/. Renames are
+atomic on one filesystem, so exactly one worker wins. While it works it
+touches the claimed file; a claim whose heartbeat is older than the lease is
+assumed dead and moved back to pending/ by whichever worker notices first.
+Every file is written to a temporary name and moved into place, so readers
+never see partial files. Heartbeats use file mtimes, so the machines'
+clocks should be roughly in sync (NTP is enough).
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+from atomic_files import atomic_path, temporary_path
+from metrics import QUEUE_JOBS, track_stage
+
+
+# --- CONFIGURATION ---
+HEARTBEAT_SECONDS = 10
+LEASE_SECONDS = 60
+POLL_SECONDS = 5
+MAX_ATTEMPTS = 3
+# ---------------------
+
+QUEUE_DIRS = ("pending", "claimed", "done", "failed", "outputs")
+JOB_STATES = ("pending", "claimed", "done", "failed")
+
+
+class LeaseLost(Exception):
+    """Raised when a worker's claim on a job expired and was taken back."""
+
+
+# -----------------------------
+# Atomic file helpers
+# -----------------------------
+def atomic_write_json(path, data):
+    """Writes JSON to a temporary file next to path, then moves it into place."""
+    with atomic_path(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def atomic_copy(src, dst):
+    """Copies a file to a temporary name next to dst, then moves it into place."""
+    with atomic_path(dst) as tmp_path:
+        shutil.copyfile(src, tmp_path)
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# -----------------------------
+# Queue
+# -----------------------------
+def init_queue(queue_dir):
+    queue_dir = Path(queue_dir)
+    for name in QUEUE_DIRS:
+        (queue_dir / name).mkdir(parents=True, exist_ok=True)
+    return queue_dir
+
+
+def enqueue(queue_dir, video_path, target_language=None, style_config=None, options=None):
+    """
+    Adds a job and returns its id. Videos inside the queue directory are
+    stored relative to it, so nodes may mount the share at different paths;
+    other paths must be the same on every node.
+    """
+    queue_dir = init_queue(queue_dir)
+    video_path = Path(video_path).resolve()
+    try:
+        video = video_path.relative_to(queue_dir.resolve()).as_posix()
+    except ValueError:
+        video = str(video_path)
+
+    # Ids sort by creation time, so workers take jobs roughly in FIFO order.
+    job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    job = {
+        "id": job_id,
+        "video": video,
+        "target_language": target_language,
+        "style_config": style_config,
+        "options": options or {},
+        "attempts": 0,
+        "created": time.time(),
+        "history": [],
+    }
+    atomic_write_json(queue_dir / "pending" / f"{job_id}.json", job)
+    return job_id
+
+
+def queue_counts(queue_dir):
+    """Returns the number of jobs in each state, and updates the queue gauges."""
+    counts = {state: len(list((Path(queue_dir) / state).glob("*.json"))) for state in JOB_STATES}
+    for state, count in counts.items():
+        QUEUE_JOBS.set(count, state=state)
+    return counts
+
+
+def resolve_video(queue_dir, job):
+    """Returns the absolute path of a job's video on this node."""
+    video = Path(job["video"])
+    return video if video.is_absolute() else Path(queue_dir) / video
+
+
+def requeue_expired(queue_dir, lease_seconds=LEASE_SECONDS):
+    """Moves claims whose heartbeat is older than the lease back to pending/ (or failed/)."""
+    queue_dir = Path(queue_dir)
+    now = time.time()
+    for claimed in (queue_dir / "claimed").glob("*.json"):
+        try:
+            if now - claimed.stat().st_mtime < lease_seconds:
+                continue
+            job = read_json(claimed)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Completed, or requeued by another worker, while we looked.
+            continue
+
+        target = "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending"
+        try:
+            os.rename(claimed, queue_dir / target / claimed.name)
+        except FileNotFoundError:
+            continue
+        print(f"Lease expired for job {job['id']} (worker {job.get('worker')}), moved to {target}/")
+
+
+def claim(queue_dir, worker_id):
+    """Claims the oldest pending job. Returns the job, or None if the queue is empty."""
+    queue_dir = Path(queue_dir)
+    for pending in sorted((queue_dir / "pending").glob("*.json")):
+        claimed = queue_dir / "claimed" / pending.name
+        try:
+            # Renames keep the mtime, so refresh it first or the claim would
+            # look expired as soon as it lands in claimed/.
+            os.utime(pending)
+            os.rename(pending, claimed)
+            job = read_json(claimed)
+        except (FileNotFoundError, FileExistsError, PermissionError):
+            # Another worker got it first.
+            continue
+
+        job["attempts"] += 1
+        job["worker"] = worker_id
+        job["claimed_at"] = time.time()
+        job["history"].append({"event": "claimed", "worker": worker_id, "time": job["claimed_at"]})
+        atomic_write_json(claimed, job)
+        return job
+    return None
+
+
+def check_lease(queue_dir, job):
+    """Raises LeaseLost if the job's claim no longer belongs to this worker."""
+    try:
+        current = read_json(Path(queue_dir) / "claimed" / f"{job['id']}.json")
+    except FileNotFoundError:
+        raise LeaseLost(job["id"])
+    if current.get("worker") != job["worker"] or current["attempts"] != job["attempts"]:
+        raise LeaseLost(job["id"])
+
+
+def _move_claim(queue_dir, job, target):
+    """
+    Moves the job's claim file to target/ with the job's current contents.
+    The claim is renamed away first, so a requeue racing with us either
+    finds nothing to requeue or leaves us without a claim (LeaseLost).
+    """
+    claimed = queue_dir / "claimed" / f"{job['id']}.json"
+    tmp_path = temporary_path(queue_dir / target / claimed.name)
+    try:
+        os.rename(claimed, tmp_path)
+    except FileNotFoundError:
+        raise LeaseLost(job["id"])
+    atomic_write_json(queue_dir / target / claimed.name, job)
+    os.remove(tmp_path)
+
+
+def complete(queue_dir, job, output_paths):
+    """Copies the outputs into outputs/<job_id>/ and moves the job to done/."""
+    queue_dir = Path(queue_dir)
+    check_lease(queue_dir, job)
+
+    output_dir = queue_dir / "outputs" / job["id"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = []
+    for path in output_paths:
+        atomic_copy(path, output_dir / Path(path).name)
+        outputs.append(f"outputs/{job['id']}/{Path(path).name}")
+
+    # Copying large outputs can take a while; make sure the claim is still ours.
+    check_lease(queue_dir, job)
+    job["outputs"] = outputs
+    job["finished_at"] = time.time()
+    job["history"].append({"event": "done", "worker": job["worker"], "time": job["finished_at"]})
+    _move_claim(queue_dir, job, "done")
+
+
+def fail(queue_dir, job, error):
+    """Returns a failed job to pending/, or moves it to failed/ after MAX_ATTEMPTS."""
+    queue_dir = Path(queue_dir)
+    check_lease(queue_dir, job)
+
+    target = "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending"
+    job["history"].append({"event": "failed", "worker": job["worker"], "time": time.time(), "error": error})
+    _move_claim(queue_dir, job, target)
+    return target
+
+
+class Heartbeat:
+    """Touches a job's claim file in the background while the job runs."""
+
+    def __init__(self, queue_dir, job, interval=HEARTBEAT_SECONDS, lease_seconds=LEASE_SECONDS):
+        self.path = Path(queue_dir) / "claimed" / f"{job['id']}.json"
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        # Set once the claim is known to be gone, or could not be renewed for a whole lease.
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        last_beat = time.monotonic()
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+                last_beat = time.monotonic()
+            except FileNotFoundError:
+                self.lost = True
+                return
+            except OSError as e:
+                # E.g. ESTALE or EACCES from a flaky network mount: keep trying while the lease lasts.
+                print(f"Heartbeat for {self.path.name} failed ({e}); retrying")
+                if time.monotonic() - last_beat >= self.lease_seconds:
+                    self.lost = True
+                    return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(queue_dir, handler, worker_id=None, exit_when_empty=False,
+               poll_seconds=POLL_SECONDS, lease_seconds=LEASE_SECONDS,
+               heartbeat_seconds=HEARTBEAT_SECONDS):
+    """
+    Claims and runs jobs until stopped. handler(job, video_path, work_dir)
+    runs one job in an empty local scratch directory and returns the paths
+    of the files to publish. Returns the number of jobs completed.
+    """
+    queue_dir = init_queue(queue_dir)
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+    print(f"Worker {worker_id} watching {queue_dir}")
+
+    while True:
+        requeue_expired(queue_dir, lease_seconds)
+        queue_counts(queue_dir)
+        job = claim(queue_dir, worker_id)
+        if job is None:
+            if exit_when_empty and not any((queue_dir / "claimed").glob("*.json")):
+                return completed
+            time.sleep(poll_seconds)
+            continue
+
+        print(f"Worker {worker_id} claimed job {job['id']} ({job['video']}, attempt {job['attempts']})")
+        work_dir = tempfile.mkdtemp(prefix=f"subtitles-{job['id']}-")
+        try:
+            with Heartbeat(queue_dir, job, heartbeat_seconds, lease_seconds) as heartbeat:
+                try:
+                    with track_stage("job"):
+                        outputs = handler(job, resolve_video(queue_dir, job), work_dir)
+                except (Exception, SystemExit) as e:
+                    error = "".join(traceback.format_exception_only(type(e), e)).strip()
+                    target = fail(queue_dir, job, error)
+                    print(f"Job {job['id']} failed ({error}), moved to {target}/")
+                    continue
+
+                if heartbeat.lost:
+                    raise LeaseLost(job["id"])
+                # Still heartbeating: copying the outputs to the share can outlast the lease.
+                complete(queue_dir, job, outputs)
+            completed += 1
+            print(f"Job {job['id']} done: {len(outputs)} output(s)")
+        except LeaseLost:
+            print(f"Lost the lease on job {job['id']}; another worker will redo it")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# -----------------------------
+# Self-test
+# -----------------------------
+def _selftest_handler(job, video_path, work_dir):
+    if job["options"].get("crash") and job["attempts"] == 1:
+        # Simulate a node dying mid-job: no heartbeat, no cleanup.
+        os._exit(1)
+    time.sleep(job["options"].get("sleep", 0.1))
+    output = Path(work_dir) / f"{Path(video_path).stem}.txt"
+    output.write_text(f"{job['id']} {os.getpid()}\n", encoding="utf-8")
+    return [output]
+
+
+def _selftest_worker(queue_dir):
+    run_worker(queue_dir, _selftest_handler, exit_when_empty=True,
+               poll_seconds=0.2, lease_seconds=2, heartbeat_seconds=0.5)
+
+
+def selftest(num_workers=4, num_jobs=20):
+    """
+    Runs several worker processes against one temporary queue, with one job
+    that kills its worker, and checks every job finished exactly once.
+    """
+    import multiprocessing
+
+    with tempfile.TemporaryDirectory() as queue_dir:
+        for i in range(num_jobs):
+            enqueue(queue_dir, Path(queue_dir) / f"clip{i:03}.mp4", options={"crash": i == 0})
+
+        # One extra worker replaces the one the crashing job kills.
+        processes = [
+            multiprocessing.Process(target=_selftest_worker, args=(queue_dir,))
+            for _ in range(num_workers + 1)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+
+        done = [read_json(path) for path in Path(queue_dir, "done").glob("*.json")]
+        left = [p.name for name in ("pending", "claimed", "failed") for p in Path(queue_dir, name).glob("*.json")]
+        ids = [job["id"] for job in done]
+        missing_outputs = [out for job in done for out in job["outputs"] if not (Path(queue_dir) / out).exists()]
+
+        print(f"{len(done)}/{num_jobs} jobs done, {len(set(ids))} unique, "
+              f"{len(left)} left over, {len(missing_outputs)} missing outputs")
+        ok = len(done) == num_jobs and len(set(ids)) == num_jobs and not left and not missing_outputs
+        print("Self-test passed." if ok else "Self-test FAILED.")
+        return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-directory work queue.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = subparsers.add_parser("status", help="Count the jobs in each state.")
+    status_parser.add_argument("queue_dir", type=str)
+
+    selftest_parser = subparsers.add_parser("selftest", help="Run several local workers against a temporary queue.")
+    selftest_parser.add_argument("--workers", type=int, default=4)
+    selftest_parser.add_argument("--jobs", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "status":
+        for state, count in queue_counts(args.queue_dir).items():
+            print(f"{state:<8} {count}")
+    else:
+        sys.exit(selftest(args.workers, args.jobs))